@@ -2,12 +2,14 @@ import os
 import logging
 from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
-from bson.objectid import ObjectId
-import jwt
 from flasgger import Swagger
 
-from utils.config import JWT_SECRET_KEY, JWT_ALGORITHM
+from utils.config import ENSURE_INDEXES_ON_STARTUP, OUTBOX_DISPATCHER_ENABLED
 from utils.db import db
+from utils.auth import token_required
+from utils import metrics
+from utils.indexes import ensure_indexes
+from utils.outbox import start_dispatcher
 from routes.user_test import user_test
 from routes.reward_routes import reward_routes
 from routes.item_routes import item_routes
@@ -17,33 +19,6 @@ from routes.satisfaction_routes import satisfaction_bp
 from routes.report_routes import report_routes
 from routes.attendance_routes import attendance_routes
 
-# JWT 인증 데코레이터
-def token_required(f):
-    from functools import wraps
-
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return json_kor({"error": "Authorization 헤더가 필요합니다."}, 401)
-
-        token = auth_header.split(" ")[1]
-        try:
-            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-            user = db.user.find_one({"_id": ObjectId(payload["user_id"])})
-            if not user:
-                raise jwt.InvalidTokenError
-            request.user = user
-            request.user_id = str(user["_id"])
-        except jwt.ExpiredSignatureError:
-            return json_kor({"error": "토큰이 만료되었습니다."}, 401)
-        except jwt.InvalidTokenError:
-            return json_kor({"error": "유효하지 않은 토큰입니다."}, 401)
-
-        return f(*args, **kwargs)
-    return decorated
-
-
 def json_kor(data, status=200):
     return Response(
         response=jsonify(data).get_data(as_text=True),
@@ -97,8 +72,9 @@ def create_app():
 
         # 닉네임 추출
         nickname = ""
-        if hasattr(request, "user") and isinstance(request.user, dict):
-            nickname = request.user.get("nickname", "")
+        if hasattr(request, "nickname"):
+            # token_required가 토큰/프로필 캐시에서 설정 (유저 문서 조회 없음)
+            nickname = request.nickname or ""
         else:
             # 로그인 등 Body에서 닉네임 추출
             try:
@@ -159,6 +135,24 @@ def create_app():
     def root():
         return '마음의 항해 백엔드가 정상 작동 중입니다.'
 
+    # ✅ 인덱스 생성 (이미 있으면 no-op)
+    if ENSURE_INDEXES_ON_STARTUP:
+        try:
+            _, failed = ensure_indexes(db, log=logging.warning)
+            if failed:
+                logging.error(f"[indexes] 인덱스 {len(failed)}개 생성 실패 → scripts/ensure_indexes.py 실행 필요")
+        except Exception as e:
+            logging.warning(f"[indexes] ensure_indexes 실패: {e}")
+
+    # ✅ 알림 아웃박스 디스패처 (메일 발송은 요청 경로 밖에서)
+    if OUTBOX_DISPATCHER_ENABLED:
+        start_dispatcher()
+
+    # ✅ 캐시·커넥션 풀 등 내부 지표 조회
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        return json_kor(metrics.snapshot())
+
     # ✅ 블루프린트 등록
     app.register_blueprint(user_test, url_prefix="/api/users")
     app.register_blueprint(reward_routes, url_prefix="/reward")
@@ -3,11 +3,21 @@ import time
 import json
 import uuid
 import random
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
-from openai import OpenAI
-from pymongo import MongoClient
+from openai import OpenAI, RateLimitError
+from pymongo import MongoClient, UpdateOne, ReturnDocument
+from pymongo.errors import PyMongoError, BulkWriteError
 from dotenv import load_dotenv
 from utils.db import db
+from utils.config import (
+    AUTO_REPLY_CONCURRENCY, AUTO_REPLY_BATCH_SIZE, AUTO_REPLY_MAX_RPM, AUTO_REPLY_RATE_LIMIT_RETRIES,
+    AUTO_REPLY_LEASE_SECONDS, AUTO_REPLY_DELAY_HOURS, AUTO_REPLY_MODE, REPLY_INTERVAL_HOURS,
+    AUTO_REPLY_JITTER_SECONDS
+)
+from utils.letter_pipeline import retry_pending_titles, retry_pending_labels
 from bson import ObjectId
 
 # 환경변수 로드
@@ -18,6 +28,30 @@ client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 
+class RateLimiter:
+    """분당 호출 수 제한: 호출 간 최소 간격을 보장 (여러 스레드 공유)"""
+
+    def __init__(self, max_per_minute):
+        self.interval = 60.0 / max_per_minute if max_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+rate_limiter = RateLimiter(AUTO_REPLY_MAX_RPM)
+
+# 편지 선점 시 기록하는 워커 식별자 (여러 인스턴스가 동시에 돌아도 구분 가능)
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
 # Fallback 메시지
 AI_REPLY_POOL = [
     "지금도 충분히 잘하고 있어요.",
@@ -35,57 +69,235 @@ def generate_ai_reply(content):
 공감 위주로 3-4문장의 답장을 생성해주세요.
 존댓말로 작성해주세요.
 """
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "당신은 따뜻한 답장을 잘 쓰는 AI입니다."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.85
-        )
-        reply_text = response.choices[0].message.content.strip()
-        return reply_text
-    except Exception as e:
-        print("AI 응답 실패:", e)
-        return random.choice(AI_REPLY_POOL)
-
-def auto_reply_to_old_letters():
-    threshold = datetime.utcnow() - timedelta(hours=24)
-
-    query = {
-        "status": "sent",
-        "created_at": {"$lte": threshold},
-        "to": {"$ne": "volunteer_user"},
-        "$expr": {"$ne": ["$to", "$from"]}
-    }
-
-    letters = list(db.letter.find(query))
-    print(f"{len(letters)}건의 자동 답장 대상 편지를 찾았습니다.")
-
-    for mail in letters:
-        reply = generate_ai_reply(mail.get('content', ''))
-        comment = {
-            "_id": ObjectId(),
-            "from": "온달",
-            "to": mail["from"],
-            "content": reply,
-            "read": False,
-            "created_at": datetime.utcnow(),
-            "original_letter_id": mail["_id"]
-        }
-        db.comment.insert_one(comment)
-        db.letter.update_one(
-            {"_id": mail["_id"]},
-            {"$set": {"status": "auto_replied", "replied_at": datetime.utcnow()}}
+    for attempt in range(AUTO_REPLY_RATE_LIMIT_RETRIES + 1):
+        rate_limiter.acquire()
+        try:
+            response = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": "당신은 따뜻한 답장을 잘 쓰는 AI입니다."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.85
+            )
+            reply_text = response.choices[0].message.content.strip()
+            return reply_text
+        except RateLimitError as e:
+            # 429: 잠시 쉬었다가 재시도, 재시도 소진 시 fallback
+            if attempt < AUTO_REPLY_RATE_LIMIT_RETRIES:
+                backoff = 2 ** attempt + random.random()
+                print(f"AI 요청 한도 초과, {backoff:.1f}초 후 재시도: {e}")
+                time.sleep(backoff)
+                continue
+            print("AI 응답 실패 (요청 한도):", e)
+        except Exception as e:
+            print("AI 응답 실패:", e)
+            break
+    return random.choice(AI_REPLY_POOL)
+
+# 자동 답장 대상 공통 조건 (선점 쿼리와 다음 기상 시각 계산에 함께 사용)
+ELIGIBLE_FILTER = {
+    "to": {"$ne": "volunteer_user"},
+    "$expr": {"$ne": ["$to", "$from"]}
+}
+
+# 다음 패스까지 최소 대기 시간(초): 다른 워커가 잡고 있는 편지 때문에 바쁜 루프가 돌지 않도록
+MIN_SLEEP_SECONDS = 5
+
+def claim_letters(owner=WORKER_ID):
+    """
+    자동 답장 대상 편지를 한 건씩 원자적으로 선점(status: auto_replying + lease)해서 반환하는 제너레이터.
+    lease가 만료된 편지(워커가 죽은 경우)도 다시 가져온다.
+    """
+    while True:
+        now = datetime.utcnow()
+        threshold = now - timedelta(hours=AUTO_REPLY_DELAY_HOURS)
+        mail = db.letter.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "sent", "created_at": {"$lte": threshold}},
+                    {"status": "auto_replying", "lease_expires_at": {"$lte": now}},
+                ],
+                **ELIGIBLE_FILTER
+            },
+            {"$set": {
+                "status": "auto_replying",
+                "lease_owner": owner,
+                "lease_expires_at": now + timedelta(seconds=AUTO_REPLY_LEASE_SECONDS)
+            }},
+            projection={"_id": 1, "from": 1, "content": 1},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
         )
-        print(f"자동 답장 완료: 편지 ID {mail['_id']}")
+        if not mail:
+            return
+        yield mail
 
-if __name__ == "__main__":
-    interval_hours = int(os.getenv("REPLY_INTERVAL_HOURS", "6"))
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 자동 답장 워커 시작! {interval_hours}시간 간격으로 실행")
+def write_reply_batch(results, owner=WORKER_ID):
+    """
+    (편지, 답장) 목록을 comment / letter 각각 bulk_write 한 번으로 저장.
+    - 답장은 편지당 하나만 생기도록 upsert (lease를 뺏긴 뒤 늦게 써도 중복 없음)
+      동시에 upsert한 경우는 comment 유니크 인덱스(original_letter_id, from=온달)가 막고, 진 쪽은 무시
+    - 편지 상태는 내가 lease를 가진 경우에만 auto_replied로 변경
+    """
+    if not results:
+        return
+    now = datetime.utcnow()
+    comments = []
+    updates = []
+    for mail, reply in results:
+        comments.append(UpdateOne(
+            {"original_letter_id": mail["_id"], "from": "온달"},
+            {"$setOnInsert": {
+                "_id": ObjectId(),
+                "to": mail["from"],
+                "content": reply,
+                "read": False,
+                "created_at": now
+            }},
+            upsert=True
+        ))
+        updates.append(UpdateOne(
+            {"_id": mail["_id"], "status": "auto_replying", "lease_owner": owner},
+            {"$set": {"status": "auto_replied", "replied_at": now},
+             "$unset": {"lease_owner": "", "lease_expires_at": ""}}
+        ))
+    try:
+        db.comment.bulk_write(comments, ordered=False)
+    except BulkWriteError as e:
+        # 다른 워커가 먼저 답장을 넣은 편지(중복 키)만 건너뜀
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+    db.letter.bulk_write(updates, ordered=False)
+    print(f"자동 답장 {len(results)}건 저장 완료")
+
+def process_letters(letters, generate=None, write_batch=None,
+                    concurrency=AUTO_REPLY_CONCURRENCY, batch_size=AUTO_REPLY_BATCH_SIZE):
+    """
+    편지 iterable(커서)을 흘려보내며 최대 concurrency개씩 동시에 답장 생성,
+    batch_size개 모일 때마다 write_batch로 일괄 저장. 처리 건수 반환.
+    """
+    generate = generate or generate_ai_reply
+    write_batch = write_batch or write_reply_batch
+    done_count = 0
+    pending_results = []
+    in_flight = {}
+
+    def drain(block_until_below):
+        nonlocal done_count
+        while len(in_flight) >= block_until_below and in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                mail = in_flight.pop(fut)
+                pending_results.append((mail, fut.result()))
+                done_count += 1
+            if len(pending_results) >= batch_size:
+                write_batch(pending_results[:])
+                pending_results.clear()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="auto-reply") as pool:
+        for mail in letters:
+            # 커서를 한꺼번에 읽지 않도록 동시 처리 중인 작업 수를 제한
+            drain(concurrency * 2)
+            in_flight[pool.submit(generate, mail.get('content', ''))] = mail
+        drain(1)
+
+    if pending_results:
+        write_batch(pending_results)
+    return done_count
+
+def auto_reply_to_old_letters(owner=WORKER_ID):
+    # 한 번에 전부 읽지 않고, 처리할 수 있는 만큼만 한 건씩 선점해서 흘려보냄
+    count = process_letters(
+        claim_letters(owner),
+        write_batch=lambda rows: write_reply_batch(rows, owner)
+    )
+    print(f"{count}건의 편지에 자동 답장을 완료했습니다.")
+    return count
+
+def next_due_at():
+    """
+    다음 자동 답장이 필요해지는 시각 (UTC). 대기 중인 편지가 없으면 None.
+    - 가장 오래된 sent 편지의 created_at + 지연 시간
+    - 다른 워커가 잡고 있는 편지의 lease 만료 시각
+    """
+    candidates = []
+    oldest = db.letter.find_one(
+        {"status": "sent", **ELIGIBLE_FILTER},
+        {"created_at": 1},
+        sort=[("created_at", 1)]
+    )
+    if oldest and oldest.get("created_at"):
+        candidates.append(oldest["created_at"] + timedelta(hours=AUTO_REPLY_DELAY_HOURS))
+    leased = db.letter.find_one(
+        {"status": "auto_replying"},
+        {"lease_expires_at": 1},
+        sort=[("lease_expires_at", 1)]
+    )
+    if leased and leased.get("lease_expires_at"):
+        candidates.append(leased["lease_expires_at"])
+    return min(candidates) if candidates else None
 
+def run_pass():
+    processed = auto_reply_to_old_letters()
+    retry_pending_titles()
+    retry_pending_labels()
+    return processed
+
+def wait_for_new_letters(deadline):
+    """
+    deadline까지 대기. 지금 들어온 새 편지의 답장 시각(지금 + AUTO_REPLY_DELAY_HOURS)이 deadline보다
+    빠를 수 있는 동안만 change stream으로 새 편지 insert를 감시해 기상 시각을 앞당김.
+    - 대기 중인 편지가 있으면 그 편지의 답장 시각이 항상 먼저이므로 stream을 열지 않고 sleep
+    - 대기 중인 편지가 없고 지연 시간이 최대 간격보다 짧을 때(또는 0일 때)만 stream이 의미가 있음
+    change stream을 쓸 수 없는 환경(standalone 등)이면 deadline까지 sleep.
+    """
+    window = timedelta(hours=AUTO_REPLY_DELAY_HOURS)
+    if datetime.utcnow() + window < deadline:
+        try:
+            pipeline = [{"$match": {"operationType": "insert", "fullDocument.status": "sent"}}]
+            with db.letter.watch(pipeline, max_await_time_ms=60_000) as stream:
+                while datetime.utcnow() + window < deadline:
+                    change = stream.try_next()
+                    created_at = (change or {}).get("fullDocument", {}).get("created_at")
+                    if created_at:
+                        deadline = min(deadline, created_at + window)
+        except PyMongoError as e:
+            print(f"change stream 사용 불가, sleep으로 대체: {e}")
+    time.sleep(max(0.0, (deadline - datetime.utcnow()).total_seconds()))
+
+def compute_delay(mode, interval_seconds):
+    """다음 패스까지 대기 시간(초): interval 모드는 고정, due/stream 모드는 다음 답장 시각까지 (최대 interval)"""
+    delay = interval_seconds
+    if mode in ("due", "stream"):
+        due = next_due_at()
+        if due is not None:
+            delay = min(interval_seconds, (due - datetime.utcnow()).total_seconds())
+    return max(MIN_SLEEP_SECONDS, delay) + random.uniform(0, AUTO_REPLY_JITTER_SECONDS)
+
+def scheduler_loop(mode=AUTO_REPLY_MODE, interval_hours=REPLY_INTERVAL_HOURS):
+    interval_seconds = interval_hours * 3600
+    failures = 0
     while True:
-        auto_reply_to_old_letters()
-        time.sleep(3600)
+        try:
+            run_pass()
+            failures = 0
+            delay = compute_delay(mode, interval_seconds)
+        except Exception as e:
+            # 실패한 패스는 짧은 백오프 후 바로 따라잡기
+            failures += 1
+            delay = min(interval_seconds, 30 * 2 ** min(failures, 6)) + random.uniform(0, AUTO_REPLY_JITTER_SECONDS)
+            print(f"자동 답장 패스 실패 ({failures}회 연속): {e}")
+
+        wake_at = datetime.utcnow() + timedelta(seconds=delay)
+        print(f"다음 패스: {wake_at.strftime('%Y-%m-%d %H:%M:%S')} UTC ({delay:.0f}초 후)")
+        if mode == "stream":
+            wait_for_new_letters(wake_at)
+        else:
+            time.sleep(delay)
+
+if __name__ == "__main__":
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 자동 답장 워커 시작! "
+          f"mode={AUTO_REPLY_MODE}, 최대 {REPLY_INTERVAL_HOURS}시간 간격으로 실행")
+    scheduler_loop()
 
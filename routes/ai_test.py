@@ -1,10 +1,8 @@
 import os
 import sys
 import json
-from openai import OpenAI
 from utils.db import db
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from utils.llm_cache import cached_completion
 
 def get_all_letter_contents(limit: int | None = 300) -> list[str]:
     cursor = db.letter.find({}, {"_id": 0, "content": 1}).sort("created_at", -1)
@@ -20,14 +18,16 @@ def get_all_letter_contents(limit: int | None = 300) -> list[str]:
 
     return contents if limit is None else contents[:limit]
 
-def ask_gpt(prompt: str, model: str = "gpt-4o", temperature: float = 0.3) -> str:
-    """OpenAI 호출 래퍼"""
-    resp = client.chat.completions.create(
+def ask_gpt(prompt: str, model: str = "gpt-4o", temperature: float = 0.3, timeout: float = None) -> str:
+    """OpenAI 호출 래퍼 (동일 프롬프트는 캐시 재사용)"""
+    content = cached_completion(
         model=model,
         messages=[{"role": "user", "content": prompt}],
         temperature=temperature,
+        mode="report",
+        timeout=timeout,
     )
-    return resp.choices[0].message.content.strip()
+    return (content or "").strip()
 
 if __name__ == "__main__":
     contents = get_all_letter_contents(limit=100)          
@@ -6,6 +6,7 @@ from bson import ObjectId
 from pymongo import ReturnDocument 
 from utils.db import db
 from utils.auth import token_required
+from utils import item_catalog
 
 
 def json_kor(data, status=200):
@@ -32,8 +33,7 @@ item_routes = Blueprint('item_routes', __name__, url_prefix='/item')
 })
 def get_item_catalog():
     try:
-        catalog = list(db.item_catalog.find({}, {"_id": 0}))
-        return json_kor({"catalog": catalog})
+        return json_kor({"catalog": item_catalog.get_catalog()})
     except Exception as e:
         return json_kor({"error": str(e)}, 500)
 
@@ -64,26 +64,16 @@ def get_item_list():
     try:
         user_id = ObjectId(request.user_id)
         category = request.args.get("category")
-        pipeline = [
-            {"$match": {"user_id": user_id}},
-            {"$lookup": {
-                "from": "item_catalog",
-                "localField": "item_type",
-                "foreignField": "name",
-                "as": "catalog"
-            }},
-            {"$unwind": "$catalog"},
-        ]
-        if category:
-            pipeline.append({"$match": {"catalog.category": category}})
-        pipeline.append({"$project": {
-            "_id": 0,
-            "item_id": {"$toString": "$_id"},
-            "name": "$item_type",
-            "used": "$used",
-            "category": "$catalog.category"
-        }})
-        items = list(db.user_item.aggregate(pipeline))
+        # category는 지급 시 user_item에 스냅샷됨 (기존 데이터는 scripts/backfill_user_item_category.py)
+        # 카탈로그에 없는 아이템(category 없음)은 기존 $lookup/$unwind와 마찬가지로 제외
+        query = {"user_id": user_id, "category": category if category else {"$type": "string"}}
+        cursor = db.user_item.find(query, {"_id": 1, "item_type": 1, "used": 1, "category": 1})
+        items = [{
+            "item_id": str(ui["_id"]),
+            "name": ui["item_type"],
+            "used": ui.get("used"),
+            "category": ui["category"]
+        } for ui in cursor]
         return json_kor({"items": items})
     except Exception as e:
         return json_kor({"error": str(e)}, 500)
@@ -121,16 +111,12 @@ def get_item_detail(item_id):
         ui = db.user_item.find_one({"_id": uid, "user_id": user_id})
         if not ui:
             return json_kor({"error": "해당 아이템을 찾을 수 없거나 소유 권한이 없습니다."}, 404)
-        catalog = db.item_catalog.find_one(
-            {"name": ui["item_type"]},
-            {"_id": 0, "description": 1}
-        ) or {}
         detail = {
             "item_id": item_id,
             "item_name": ui["item_type"],
             "used": ui.get("used", False),
             "granted_at": ui.get("granted_at"),
-            "description": catalog.get("description", "")
+            "description": item_catalog.get_description(ui["item_type"])
         }
         return json_kor({"item": detail})
     except Exception as e:
@@ -179,14 +165,10 @@ def use_item():
         )
         if not result:
             return json_kor({"error": "사용할 수 있는 아이템이 없습니다."}, 400)
-        catalog = db.item_catalog.find_one(
-            {"name": result["item_type"]},
-            {"_id": 0, "description": 1}
-        ) or {}
         used_info = {
             "item_id": item_id,
             "item_type": result["item_type"],
-            "description": catalog.get("description", ""),
+            "description": item_catalog.get_description(result["item_type"]),
             "used_at": result.get("used_at")
         }
         return json_kor({
@@ -243,15 +225,10 @@ def unuse_item():
         if not result:
             return json_kor({"error": "이미 해제되었거나 존재하지 않는 아이템입니다."}, 400)
 
-        catalog = db.item_catalog.find_one(
-            {"name": result["item_type"]},
-            {"_id": 0, "description": 1}
-        ) or {}
-
         unused_info = {
             "item_id": item_id,
             "item_type": result["item_type"],
-            "description": catalog.get("description", ""),
+            "description": item_catalog.get_description(result["item_type"]),
             "unused_at": datetime.utcnow()
         }
 
@@ -1,26 +1,24 @@
 from flask import Blueprint, request, Response
 from flask import current_app as app
 from utils.db import db
-from utils.config import MAIL_DEBUG
 from utils.auth import token_required
 from routes.reward_routes import grant_point_by_action
-from utils.notify import notify_random_received, notify_reply_received
-import threading
+from utils.outbox import enqueue as enqueue_notification
+from utils.recipient import pick_random_recipient
+from utils.nickname import get_nickname, resolve_nicknames
+from utils.pagination import paginate
+from utils.letter_pipeline import request_title, provisional_title, schedule_title, schedule_labels
+from utils.llm_cache import cached_completion
+from utils import report_store
 import uuid
 import random
 import os
 import json
 from datetime import datetime, timedelta
-from openai import OpenAI
 from flasgger import swag_from
 from bson import ObjectId
 
-def fire_and_forget(fn, *args, **kwargs):
-    t = threading.Thread(target=fn, args=args, kwargs=kwargs, daemon=True)
-    t.start()
-
 letter_routes = Blueprint('letter_routes', __name__, url_prefix='/letter')
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # 한글 JSON 응답 헬퍼
 def json_kor(data, status=200):
@@ -29,19 +27,38 @@ def json_kor(data, status=200):
         content_type="application/json; charset=utf-8",
         status=status
     )
-def get_nickname(user_id):
-    if isinstance(user_id, str) and not ObjectId.is_valid(user_id):
-        # 문자열인데 ObjectId로 변환 불가능 → AI 닉네임 (예: "온달")
-        return user_id
 
-    try:
-        if not isinstance(user_id, ObjectId):
-            user_id = ObjectId(user_id)
-        user = db.user.find_one({"_id": user_id}, {"nickname": 1})
-        return user.get("nickname", "알 수 없음") if user else "알 수 없음"
-    except Exception:
-        return "알 수 없음"
+# 목록 API 공통 페이지네이션 파라미터 (Swagger)
+PAGINATION_PARAMS = [
+    {
+        'name': 'cursor',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'description': '이전 응답의 next_cursor (없으면 첫 페이지)'
+    },
+    {
+        'name': 'limit',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'description': '페이지 크기 (최대 PAGE_SIZE)'
+    }
+]
 
+def get_first_replies(letter_ids):
+    """편지별 첫 답장(comment)을 한 번의 $in 쿼리로 조회 → {편지 _id: comment}"""
+    replies = {}
+    letter_ids = list(letter_ids)
+    if not letter_ids:
+        return replies
+    cursor = db.comment.find(
+        {'original_letter_id': {'$in': letter_ids}},
+        {'_id': 0, 'original_letter_id': 1, 'from': 1, 'content': 1, 'created_at': 1}
+    ).sort('created_at', 1)
+    for c in cursor:
+        replies.setdefault(c['original_letter_id'], c)
+    return replies
       
 # AI fallback pool
 AI_REPLY_POOL = [
@@ -61,30 +78,18 @@ QUESTION_POOL = [
 
 # GPT 헬퍼 함수
 def generate_title_with_gpt(content):
-    prompt = f"""
-아래는 사용자가 쓴 편지 내용입니다:
-"{content}"
-
-이 편지의 내용을 함축적으로 잘 요약하고 있는 짧은 제목을 1개 생성해주세요.
-10자 이내로, 핵심 키워드를 담아 응답해주세요.
-"""
+    # 동기 버전 (send_letter는 schedule_title로 백그라운드 생성)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "당신은 제목을 잘 만드는 AI입니다."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=16
-        )
-        return response.choices[0].message.content.strip().strip('"')
+        return request_title(content)
     except Exception:
-        return content[:10]
+        return provisional_title(content)
 import re
 
 # GPT 응답에서 ```json ... ``` 제거
 
+# 답장 옵션 응답 검사 (JSON 배열이 아니면 캐시하지 않음)
+def _is_json_list(text):
+    return isinstance(json.loads(text.strip()), list)
 
 def generate_ai_replies_with_gpt(content: str, mode: str = 'assist') -> list:
     """
@@ -120,16 +125,17 @@ def generate_ai_replies_with_gpt(content: str, mode: str = 'assist') -> list:
         else:
             return []
 
-        response = client.chat.completions.create(
+        # 답장 옵션(assist)은 같은 편지면 캐시 재사용, 온달 답장(ai)은 매번 새로 생성
+        result = cached_completion(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.8,
-        )
-
-        result = response.choices[0].message.content.strip()
+            mode=mode,
+            use_cache=(mode == 'assist'),
+            validate=_is_json_list if mode == 'assist' else None,
+        ).strip()
         print(f"[GPT 응답]: {repr(result)}")
-        import json
-        
+
         if mode == 'assist':
             # 질문 리스트 반환
             questions = json.loads(result)
@@ -236,21 +242,21 @@ def send_letter():
     elif to_type == 'volunteer':
         receiver = 'volunteer'
     elif to_type == 'random':
-        users = db.user.distinct('_id')
-        candidates = [u for u in users if u != sender]
-        if not candidates:
+        receiver = pick_random_recipient(sender)
+        if not receiver:
             return json_kor({"error": "오늘 받을 수 있는 사용자가 없습니다."}, 400)
-        receiver = random.choice(candidates)
     else:
         return json_kor({"error": "유효하지 않은 수신 타입"}, 400)
     
-    # 편지 데이터 생성
-    title = generate_title_with_gpt(content)
+    # 편지 데이터 생성 (임시 제목으로 먼저 저장, GPT 제목은 백그라운드에서 갱신)
+    title = provisional_title(content)
     letter = {
         "_id": ObjectId(), 
         "from": sender, 
         "to": receiver, 
         "title": title,
+        "title_pending": True,
+        "labels_pending": True,
         "emotion": emotion, 
         "content": content, 
         "status": 'sent',
@@ -258,12 +264,13 @@ def send_letter():
         "created_at": datetime.now()
     }
     db.letter.insert_one(letter)
+    report_store.on_letter_created(sender, letter["created_at"], emotion)
+    schedule_title(letter["_id"], content)
+    schedule_labels(letter["_id"], content)
 
-    # 🔔 랜덤 수신자에게 이메일 알림
-    if to_type == 'random' and receiver:      
-        ok, err = notify_random_received(str(receiver), str(letter["_id"]), debug_mail=MAIL_DEBUG)
-        if not ok:
-            app.logger.warning(f"[mail] notify_random_received fail: {err}")
+    # 🔔 랜덤 수신자에게 이메일 알림 (아웃박스 적재만, 발송은 디스패처가 처리)
+    if to_type == 'random' and receiver:
+        enqueue_notification("random_received", receiver, letter["_id"])
 
     ### 유저 테스트용 - 실제 배포 시에는 삭제 ####
     """
@@ -287,6 +294,7 @@ def send_letter():
 @swag_from({
     'tags': ['Letter'],
     'summary': '나에게 온 미답장 편지 목록 조회',
+    'parameters': PAGINATION_PARAMS,
     'responses': {
         200: {'description': '미답장 편지 목록 반환'},
         500: {'description': '서버 에러'}
@@ -295,10 +303,19 @@ def send_letter():
 
 def get_my_unread_letters():
     user = ObjectId(request.user_id)
-    letters = list(db.letter.find({"to": user, "status": 'sent', "from": {"$nin": ['volunteer_user', user]}},{'_id': 1, 'from': 1, 'title': 1, 'emotion': 1, 'created_at': 1}).sort('created_at', -1))
+    try:
+        letters, next_cursor = paginate(
+            db.letter,
+            {"to": user, "status": 'sent', "from": {"$nin": ['volunteer_user', user]}},
+            {'_id': 1, 'from': 1, 'title': 1, 'emotion': 1, 'created_at': 1},
+            'created_at', request.args
+        )
+    except ValueError:
+        return json_kor({"error": "유효하지 않은 cursor입니다."}, 400)
+    nicknames = resolve_nicknames(l['from'] for l in letters)
     for letter in letters:
-          letter['from_nickname'] = get_nickname(letter['from'])
-    return json_kor({"unread_letters": letters}, 200)
+          letter['from_nickname'] = nicknames[letter['from']]
+    return json_kor({"unread_letters": letters, "next_cursor": next_cursor}, 200)
 
 
 @letter_routes.route('/<letter_id>', methods=['GET'])
@@ -388,8 +405,9 @@ def get_letter_detail(letter_id):
     
     if letter['from'] != user and letter['to'] != user:
         return json_kor({"error": "해당 편지에 접근할 권한이 없습니다."}, 403)
-    letter['from_nickname'] = get_nickname(letter['from'])
-    letter['to_nickname'] = get_nickname(letter['to'])
+    nicknames = resolve_nicknames([letter['from'], letter['to']])
+    letter['from_nickname'] = nicknames[letter['from']]
+    letter['to_nickname'] = nicknames[letter['to']]
 
     result = {'letter': letter}
     
@@ -409,8 +427,9 @@ def get_letter_detail(letter_id):
 
         unread_ids = [ObjectId(c['_id']) for c in comments if not c.get('read')]
         
+        comment_nicknames = resolve_nicknames(c['from'] for c in comments)
         for comment in comments:
-            comment['from_nickname'] = get_nickname(comment['from'])
+            comment['from_nickname'] = comment_nicknames[comment['from']]
         
         if unread_ids:
             db.comment.update_many(
@@ -532,17 +551,19 @@ def reply_letter():
     orig = db.letter.find_one({'_id': lid})
     if not orig or orig.get('status') != 'sent':
         return json_kor({'error': '답장할 수 없습니다.'}, 400)
+    # 동시에 답장한 경우 먼저 상태를 바꾼 요청만 답장 저장 + 집계
+    claimed = db.letter.update_one({'_id': lid, 'status': 'sent'}, {'$set': {'status': 'replied', 'replied_at': datetime.now()}})
+    if claimed.modified_count != 1:
+        return json_kor({'error': '답장할 수 없습니다.'}, 400)
     comment = {'_id': ObjectId(), 'from': ObjectId(request.user_id),'to': orig.get('from'), 'content': text, 'read': False,'created_at': datetime.now(), 'original_letter_id': lid}
     db.comment.insert_one(comment)
-    db.letter.update_one({'_id': lid}, {'$set': {'status': 'replied', 'replied_at': datetime.now()}})
+    report_store.on_reply_created(comment['from'], comment['created_at'])
+    report_store.on_letter_replied(orig.get('from'), orig.get('created_at'))
 
     # 🔔 답장 도착 메일 알림 (원 발신자에게)
     orig_sender = orig.get('from')
     if orig_sender:
-        uid = str(orig_sender)
-        ok, err = notify_reply_received(uid, str(lid), debug_mail=MAIL_DEBUG)
-        if not ok:
-            app.logger.warning(f"[mail] reply_notify fail: {err}")
+        enqueue_notification("reply_received", orig_sender, lid)
         '''
         try:
             uid = str(orig_sender)
@@ -562,6 +583,7 @@ def reply_letter():
 @swag_from({
     'tags': ['Letter'],
     'summary': '내가 받은 편지 중 답장 완료된 목록 조회',
+    'parameters': PAGINATION_PARAMS,
     'responses': {
         200: {
             'description': '답장 완료된 편지 목록 반환',
@@ -583,18 +605,23 @@ def reply_letter():
 })
 def get_replied_letters_to_me():
     user = ObjectId(request.user_id)
-    letters = list(db.letter.find({
-        'from': user,
-        'status': {'$in': ['replied', 'auto_replied']},
-    }, {
-        '_id': 1, 'to': 1, 'title': 1, 'emotion': 1, 'content': 1,
-        'status': 1, 'replied_at': 1
-    }).sort('replied_at', -1))
+    try:
+        letters, next_cursor = paginate(db.letter, {
+            'from': user,
+            'status': {'$in': ['replied', 'auto_replied']},
+        }, {
+            '_id': 1, 'to': 1, 'title': 1, 'emotion': 1, 'content': 1,
+            'status': 1, 'replied_at': 1
+        }, 'replied_at', request.args)
+    except ValueError:
+        return json_kor({"error": "유효하지 않은 cursor입니다."}, 400)
+    nicknames = resolve_nicknames(l['to'] for l in letters)
+    replies = get_first_replies(l['_id'] for l in letters)
     for letter in letters:
-        letter['to_nickname'] = get_nickname(letter['to'])
+        letter['to_nickname'] = nicknames[letter['to']]
 
-        # 해당 편지의 답장(comment) 조회
-        reply = db.comment.find_one({'original_letter_id': letter['_id']})
+        # 해당 편지의 답장(comment)
+        reply = replies.get(letter['_id'])
         if reply:
             letter['reply'] = {
                 'from': str(reply['from']),
@@ -605,7 +632,7 @@ def get_replied_letters_to_me():
             letter['reply'] = None
 
 
-    return json_kor({'replied-to-me': letters}, 200)
+    return json_kor({'replied-to-me': letters, 'next_cursor': next_cursor}, 200)
 
 """@letter_routes.route('/for-letter/<letter_id>', methods=['GET'])
 @token_required
@@ -637,6 +664,7 @@ def auto_reply_to_old_letters():
     'tags': ['Letter'],
     'summary': '내가 저장한 편지 목록 조회',
     'description': '사용자가 저장한 편지들을 최신순으로 반환합니다.',
+    'parameters': PAGINATION_PARAMS,
     'responses': {
         200: {
             'description': '저장된 편지 목록 조회 성공',
@@ -702,21 +730,32 @@ def auto_reply_to_old_letters():
 def get_saved_letters():
         print("✅ /letter/saved 진입")
         user = ObjectId(request.user_id)
-        letters = list(db.letter.find({'from': user, 'saved': True},{'_id':1,'from':1,'title':1,'emotion':1,'created_at':1,'to':1}).sort('created_at', -1))
+        try:
+            letters, next_cursor = paginate(
+                db.letter, {'from': user, 'saved': True},
+                {'_id':1,'from':1,'title':1,'emotion':1,'created_at':1,'to':1},
+                'created_at', request.args
+            )
+        except ValueError:
+            return json_kor({"error": "유효하지 않은 cursor입니다."}, 400)
         print("🧾 조회된 편지 수:", len(letters))
+        nicknames = resolve_nicknames(
+            [l.get('from') for l in letters] + [l.get('to') for l in letters]
+        )
+        replies = get_first_replies(l['_id'] for l in letters)
         for letter in letters:
             if letter.get('from'):
-                letter['from_nickname'] = get_nickname(letter['from'])
+                letter['from_nickname'] = nicknames[letter['from']]
             else:
                 letter['from_nickname'] = "(알 수 없음)"
 
             if letter.get('to'):
-                letter['to_nickname'] = get_nickname(letter['to'])
+                letter['to_nickname'] = nicknames[letter['to']]
             else:
                 letter['to_nickname'] = "(알 수 없음)"
 
             # 답장(comment) 존재 시 포함
-            comment = db.comment.find_one({'original_letter_id': letter['_id']})
+            comment = replies.get(letter['_id'])
             if comment:
                 letter['reply'] = {
                     'from': str(comment['from']),
@@ -725,5 +764,5 @@ def get_saved_letters():
                 }
             else:
                 letter['reply'] = None
-        return json_kor({'saved_letters': letters}, 200)
+        return json_kor({'saved_letters': letters, 'next_cursor': next_cursor}, 200)
         
\ No newline at end of file
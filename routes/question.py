@@ -1,13 +1,14 @@
 from flask import Blueprint, request, Response
-from openai import OpenAI
-import os
 import json
 from flasgger import swag_from
 from utils.auth import token_required
+from utils.llm_cache import cached_completion
 
 # Flask Blueprint 생성
 question_bp = Blueprint('question', __name__)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# 감정 기반 질문 캐시 유지 시간 (초)
+QUESTION_CACHE_TTL_SECONDS = 3600
 
 # 한글 JSON 응답 함수
 def json_kor(data, status=200):
@@ -82,13 +83,15 @@ def generate_question():
 
     try:
         print("🧠 OpenAI 호출 전:", prompt)
-        response = client.chat.completions.create(
+        # 감정 종류가 몇 개뿐이라 캐시 효과가 크지만, 질문이 너무 고정되지 않도록 TTL은 짧게
+        question = cached_completion(
             model="gpt-4o",
             messages=[
                 {"role": "user", "content": prompt}],
-            temperature=0.7
-        )
-        question = response.choices[0].message.content.strip()
+            temperature=0.7,
+            mode="question",
+            ttl=QUESTION_CACHE_TTL_SECONDS
+        ).strip()
         return json_kor({"question": question}), 200
     except Exception as e:
         print("❌ OpenAI 예외:", str(e))
@@ -162,12 +165,12 @@ def help_question():
     """
 
     try:
-        response = client.chat.completions.create(
+        help_q = cached_completion(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
-        )
-        help_q = response.choices[0].message.content.strip()
+            temperature=0.7,
+            mode="help"
+        ).strip()
         return json_kor({"help_question": help_q}), 200
     except Exception as e:
         print("❌ OpenAI 예외:", str(e))
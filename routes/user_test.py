@@ -11,6 +11,7 @@ from utils.attendance import record_attendance
 from utils.auth import token_required
 from utils.response import json_kor
 from utils.mailer import send_email
+from utils.user_cache import invalidate as invalidate_profile
 
 # 이메일 인증코드
 CODE_EXPIRE_MINUTES = 10          # 인증코드 유효시간 (10분)
@@ -328,6 +329,7 @@ def signup():
         }
 
         result = db.user.insert_one(new_user)
+        invalidate_profile(result.inserted_id)
 
         # 온보딩 더미 편지 생성
         try:
@@ -556,6 +558,7 @@ def update_user():
             update_fields["email_notify_enabled"] = parsed
 
         db.user.update_one({"_id": user_id}, {"$set": update_fields})
+        invalidate_profile(user_id)
 
         updated_user = db.user.find_one({"_id": user_id})
         updated_user["_id"] = str(updated_user["_id"])
@@ -635,7 +638,7 @@ def get_my_info():
 
 
 @user_test.route('/password/change', methods=['POST'])
-@token_required
+@token_required(user_projection={"password_hash": 1})
 @swag_from({
     'tags': ['User'],
     'summary': '비밀번호 변경',
@@ -703,6 +706,7 @@ def change_password():
                 "password_updated_at": updated_at
             }}
         )
+        invalidate_profile(user["_id"])
 
         return json_kor({
             "message": "비밀번호가 변경되었습니다.",
@@ -0,0 +1,32 @@
+# scripts/backfill_letter_labels.py
+# 기존 편지에 감정/주제 라벨(ai_emotions, topic) 채우기 (리포트는 저장된 라벨만 읽음)
+# 사용법:
+#   MONGO_URI=... python scripts/backfill_letter_labels.py           → 라벨 없는 편지를 분류 대상으로 표시 후 분류
+#   MONGO_URI=... python scripts/backfill_letter_labels.py --force   → 분류 기준(프롬프트) 변경 후 전부 다시 분류
+# 편지를 --batch 통씩 묶어 토큰 예산 단위 배치로 분류 (중단 후 다시 실행해도 이어서 처리)
+import os, sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from utils.db import db
+from utils.letter_pipeline import retry_pending_labels
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    batch = int(args[args.index("--batch") + 1]) if "--batch" in args else 500
+
+    query = {} if "--force" in args else {"labels_pending": {"$exists": False}}
+    marked = db.letter.update_many(query, {"$set": {"labels_pending": True}, "$unset": {"label_attempts": ""}})
+    print(f"분류 대상 {marked.modified_count}건 표시")
+
+    # 실패한 편지는 LABEL_MAX_ATTEMPTS 회까지 다시 잡히고 그 뒤 빈 라벨로 확정되므로 반드시 끝남
+    total = 0
+    while True:
+        n = retry_pending_labels(limit=batch, stale_minutes=0)
+        if not n:
+            break
+        total += n
+
+    labeled = db.letter.count_documents({"labels_pending": False, "topic": {"$nin": ["", None]}})
+    print(f"✅ {total}건 처리 (라벨 있는 편지 {labeled}건)")
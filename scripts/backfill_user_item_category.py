@@ -0,0 +1,33 @@
+# scripts/backfill_user_item_category.py
+# 기존 user_item 문서에 카탈로그의 category/description 스냅샷 채우기 (/item/my 조인 제거용)
+# 사용법:
+#   MONGO_URI=... python scripts/backfill_user_item_category.py          → category 없는 문서만 채움
+#   MONGO_URI=... python scripts/backfill_user_item_category.py --force  → 카탈로그 변경 후 전부 다시 맞춤
+# 카탈로그 항목당 update_many 1회 (여러 번 실행해도 안전)
+import os, sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from utils.db import db
+from utils import item_catalog
+
+if __name__ == "__main__":
+    force = "--force" in sys.argv[1:]
+    item_catalog.invalidate()
+
+    total = 0
+    for item in item_catalog.get_catalog():
+        query = {"item_type": item["name"]}
+        if not force:
+            query["category"] = {"$exists": False}
+        result = db.user_item.update_many(query, {"$set": {
+            "category": item.get("category", ""),
+            "description": item.get("description", ""),
+        }})
+        if result.modified_count:
+            print(f"  {item['name']}: {result.modified_count}건")
+        total += result.modified_count
+
+    orphans = db.user_item.count_documents({"category": {"$exists": False}})
+    print(f"✅ {total}건 갱신 (카탈로그에 없는 아이템 {orphans}건은 /item/my에서 제외됨)")
@@ -0,0 +1,41 @@
+# scripts/bench_auto_reply.py
+# 자동 답장 워커 처리량 벤치마크 (GPT 호출은 고정 지연 stub, DB 쓰기 없음)
+# 사용법: python scripts/bench_auto_reply.py [편지 수] [stub 지연(초)]
+import os, sys, time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "bench")  # 실제 호출하지 않음
+
+from bson import ObjectId
+from main import process_letters
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+
+
+def stub_generate(delay):
+    def generate(content):
+        time.sleep(delay)
+        return "벤치마크 답장"
+    return generate
+
+
+def fake_letters(n):
+    for _ in range(n):
+        yield {"_id": ObjectId(), "from": ObjectId(), "content": "벤치마크 편지"}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    batches = []
+    print(f"편지 {n}건, stub 지연 {delay}s")
+    print(f"{'concurrency':>11} | {'elapsed(s)':>10} | {'letters/s':>9}")
+    for c in CONCURRENCY_LEVELS:
+        batches.clear()
+        t0 = time.perf_counter()
+        done = process_letters(fake_letters(n), generate=stub_generate(delay),
+                               write_batch=lambda rows: batches.append(len(rows)), concurrency=c)
+        elapsed = time.perf_counter() - t0
+        assert done == n == sum(batches)
+        print(f"{c:>11} | {elapsed:10.2f} | {n / elapsed:9.1f}")
@@ -0,0 +1,63 @@
+# scripts/bench_classifier.py
+# 편지 감정/주제 분류 파이프라인 벤치마크 (GPT 호출은 고정 지연 stub, DB 사용 안 함)
+#  - 편지 수에 따른 배치 수 / 배치당 추정 토큰 / 소요 시간 / 편지 id 정렬 정확도 확인
+# 사용법: python scripts/bench_classifier.py [편지 수 ...] [--delay 초]
+import os, sys, re, time, json, random
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "bench")  # 실제 호출하지 않음
+
+from bson import ObjectId
+from utils import letter_classifier as lc
+from utils.config import CLASSIFIER_BATCH_TOKENS, CLASSIFIER_CONCURRENCY
+
+WORDS = ["오늘", "학교에서", "친구랑", "시험", "때문에", "너무", "힘들었어요", "그래도", "내일은", "괜찮을",
+         "거예요", "가족", "이야기", "하고", "싶은데", "용기가", "안", "나요", "요즘", "잠이", "study", "stress"]
+TOPICS = ["학업", "친구", "가족", "진로", "건강"]
+
+
+def fake_letters(n):
+    for _ in range(n):
+        yield ObjectId(), " ".join(random.choices(WORDS, k=random.randint(20, 300)))
+
+
+def stub_llm(delay):
+    """프롬프트의 [번호] 편지마다 라벨을 돌려주는 stub (주제 통합 요청이면 매핑 반환)"""
+    def llm(prompt):
+        time.sleep(delay)
+        if prompt.startswith(lc.MERGE_PROMPT[:20]):
+            words = re.findall(r"(\S+?)\(\d+\)", prompt)
+            return json.dumps({w: w.rstrip("0123456789") for w in words}, ensure_ascii=False)
+        ids = [int(i) for i in re.findall(r"^\[(\d+)\]", prompt, re.M)]
+        return json.dumps([{"id": i, "emotions": random.sample(lc.EMOTIONS, 2),
+                            "topic": random.choice(TOPICS) + str(random.randint(1, 3))} for i in ids],
+                          ensure_ascii=False)
+    return llm
+
+
+def run(n, delay):
+    letters = list(fake_letters(n))
+    t0 = time.perf_counter()
+    batches = lc.make_batches(letters)
+    batch_tokens = [lc.estimate_tokens(lc.CLASSIFY_PROMPT) + sum(lc.estimate_tokens(t) + 4 for _, t in b)
+                    for b in batches]
+    labels = lc.classify_letters(letters, llm=stub_llm(delay))
+    elapsed = time.perf_counter() - t0
+    labeled = sum(1 for lid, _ in letters if labels.get(str(lid), {}).get("topic"))
+    topics = sorted({l["topic"] for l in labels.values()})
+    print(f"{n:>6}통 | 배치 {len(batches):>4} | 배치당 토큰 최대 {max(batch_tokens):>5} (예산 {CLASSIFIER_BATCH_TOKENS}) | "
+          f"{elapsed:6.2f}s | 라벨 {labeled}/{n} | 통합 주제 {topics}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    delay = 0.5
+    if "--delay" in args:
+        i = args.index("--delay")
+        delay = float(args[i + 1])
+        del args[i:i + 2]
+    sizes = [int(a) for a in args] or [10, 100, 1000, 5000]
+    print(f"stub 지연 {delay}s, 동시 배치 {CLASSIFIER_CONCURRENCY}")
+    for n in sizes:
+        run(n, delay)
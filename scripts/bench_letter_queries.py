@@ -0,0 +1,90 @@
+# scripts/bench_letter_queries.py
+# 편지 목록 API 요청 1회당 MongoDB 명령 수 / 지연시간 기록 (N+1 회귀 확인용)
+# 사용법: MONGO_URI=... python scripts/bench_letter_queries.py [편지 수 ...]
+# 임시 유저/편지/답장을 만들고 측정 후 삭제함
+import os, sys, time
+from collections import Counter
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from pymongo import monitoring
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.counts = Counter()
+
+    def started(self, event):
+        self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# MongoClient 생성 전에 등록해야 함
+counter = CommandCounter()
+monitoring.register(counter)
+
+import jwt
+from bson import ObjectId
+from app import app
+from utils.db import db
+from utils.config import JWT_SECRET_KEY, JWT_ALGORITHM
+
+ENDPOINTS = ["/letter/random", "/letter/saved", "/letter/replied-to-me"]
+
+
+def seed(n):
+    me = db.user.insert_one({"nickname": f"bench-{ObjectId()}"}).inserted_id
+    peers = [db.user.insert_one({"nickname": f"bench-peer-{ObjectId()}"}).inserted_id for _ in range(5)]
+    now = datetime.utcnow()
+    letters, comments = [], []
+    for i in range(n):
+        lid = ObjectId()
+        peer = peers[i % len(peers)]
+        letters.append({"_id": lid, "from": me, "to": peer, "title": f"bench{i}", "emotion": "기쁨",
+                        "content": "bench", "status": "replied", "saved": True,
+                        "created_at": now - timedelta(minutes=i), "replied_at": now - timedelta(minutes=i)})
+        comments.append({"from": peer, "to": me, "content": "bench reply", "read": False,
+                         "created_at": now - timedelta(minutes=i), "original_letter_id": lid})
+        # 받은 편지(미답장)
+        letters.append({"from": peer, "to": me, "title": f"inbox{i}", "emotion": "슬픔", "content": "bench",
+                        "status": "sent", "created_at": now - timedelta(minutes=i)})
+    if letters:
+        db.letter.insert_many(letters)
+        db.comment.insert_many(comments)
+    return me, peers
+
+
+def cleanup(me, peers):
+    db.comment.delete_many({"to": me})
+    db.letter.delete_many({"$or": [{"from": me}, {"to": me}]})
+    db.user.delete_many({"_id": {"$in": [me] + peers}})
+
+
+def run(n):
+    me, peers = seed(n)
+    try:
+        token = jwt.encode({"user_id": str(me), "nickname": "bench", "exp": datetime.utcnow() + timedelta(minutes=10)},
+                           JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+        client = app.test_client()
+        for path in ENDPOINTS:
+            counter.counts.clear()
+            t0 = time.perf_counter()
+            resp = client.get(path, headers={"Authorization": f"Bearer {token}"})
+            elapsed = (time.perf_counter() - t0) * 1000
+            total = sum(counter.counts.values())
+            print(f"{n:>6} | {path:<22} | {resp.status_code} | {total:>4} cmds | {elapsed:8.1f} ms | {dict(counter.counts)}")
+    finally:
+        cleanup(me, peers)
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 100, 500]
+    for n in sizes:
+        run(n)
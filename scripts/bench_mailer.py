@@ -0,0 +1,82 @@
+# scripts/bench_mailer.py
+# 메일 발송 처리량(건/초) 비교: 매번 새 연결(기존 방식) vs 커넥션 풀 send_email vs send_many
+# 로컬 aiosmtpd 서버로 측정 (pip install aiosmtpd 필요, 실제 메일은 나가지 않음)
+# 사용법: python scripts/bench_mailer.py [메일 수] [핸드셰이크 지연(초)]
+#  - 핸드셰이크 지연: EHLO 응답을 늦춰 원격 릴레이의 TCP/TLS/로그인 비용을 흉내냄
+import os, sys, time, asyncio, smtplib
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    sys.exit("aiosmtpd가 필요합니다: pip install aiosmtpd")
+
+PORT = 8025
+
+
+class CountingHandler:
+    def __init__(self, handshake_delay):
+        self.handshake_delay = handshake_delay
+        self.received = 0
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        await asyncio.sleep(self.handshake_delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+# utils.config가 import 시점에 환경변수를 읽으므로 먼저 설정
+os.environ.update({
+    "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(PORT), "EMAIL_USE_TLS": "false",
+    "SMTP_USER": "bench@example.com", "SMTP_PASSWORD": "",
+})
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from utils import mailer
+
+
+def legacy_send(to_email, subject, html):
+    """풀 도입 전 방식: 메일 1통마다 연결/EHLO/종료"""
+    msg = mailer._build_message(to_email, subject, html)
+    with smtplib.SMTP(mailer.SMTP_HOST, int(mailer.SMTP_PORT), timeout=10) as smtp:
+        smtp.ehlo()
+        smtp.sendmail(mailer.SMTP_USER, [to_email], msg.as_string())
+    return True, None
+
+
+def run(label, fn, n, handler):
+    handler.received = handler.sessions = 0
+    t0 = time.perf_counter()
+    fn(n)
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<22} | {n:>5}통 | {elapsed:7.2f}s | {n / elapsed:8.1f} 통/s | 세션 {handler.sessions:>4} | 수신 {handler.received}")
+
+
+def messages(n):
+    html = mailer.tpl_random_received("벤치", "벤치마크 편지", mailer.APP_BASE_URL)
+    return [(f"user{i}@example.com", "새 편지가 도착했어요 ✉️", html) for i in range(n)]
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+
+    handler = CountingHandler(delay)
+    controller = Controller(handler, hostname="127.0.0.1", port=PORT)
+    controller.start()
+    try:
+        run("새 연결 (기존)", lambda k: [legacy_send(*m) for m in messages(k)], n, handler)
+        run("풀 send_email", lambda k: [mailer.send_email(*m) for m in messages(k)], n, handler)
+        run("풀 send_many", lambda k: mailer.send_many(messages(k)), n, handler)
+        print("pool stats:", mailer.pool.stats())
+    finally:
+        mailer.pool.close_all()
+        controller.stop()
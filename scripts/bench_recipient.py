@@ -0,0 +1,57 @@
+# scripts/bench_recipient.py
+# 랜덤 수신자 선택 지연시간 벤치마크 (유저 수 1k → 1M)
+# 사용법: MONGO_URI=... python scripts/bench_recipient.py [반복횟수]
+# ⚠️ BENCH_DB_NAME(기본 bench_recipient) DB의 user 컬렉션을 지우고 다시 채움
+import os, sys, time, statistics
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from pymongo import MongoClient
+from bson import ObjectId
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from utils.recipient import pick_random_recipient
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+INSERT_BATCH = 10_000
+
+client = MongoClient(os.getenv("MONGO_URI"))
+bench_db = client[os.getenv("BENCH_DB_NAME", "bench_recipient")]
+users = bench_db.user
+
+
+def grow_to(n):
+    """user 컬렉션을 n명까지 채움 (limited_access 유저 약 10% 섞음)"""
+    current = users.estimated_document_count()
+    while current < n:
+        size = min(INSERT_BATCH, n - current)
+        users.insert_many([
+            {"nickname": f"bench{current + i}", "limited_access": (current + i) % 10 == 0}
+            for i in range(size)
+        ], ordered=False)
+        current += size
+
+
+def measure(rounds):
+    sender = ObjectId()
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        pick_random_recipient(sender, users=users)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    users.drop()
+    print(f"{'users':>10} | {'p50(ms)':>8} | {'p95(ms)':>8}")
+    for n in SIZES:
+        grow_to(n)
+        p50, p95 = measure(rounds)
+        print(f"{n:>10} | {p50:8.2f} | {p95:8.2f}")
+    users.drop()
@@ -0,0 +1,33 @@
+# scripts/ensure_indexes.py
+# 인덱스 생성 + explain 기반 COLLSCAN 검사
+# 사용법:
+#   python scripts/ensure_indexes.py          → 예전 출석 문서 병합 + 인덱스 생성 후 검사 (생성 실패 시 exit 1)
+#   python scripts/ensure_indexes.py --check  → 생성 없이 검사만 (COLLSCAN 있으면 exit 1, CI용)
+import os, sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from utils.db import db
+from utils.indexes import ensure_indexes, find_collscans
+from utils.attendance import merge_legacy_attendance
+
+if __name__ == "__main__":
+    check_only = "--check" in sys.argv[1:]
+
+    if not check_only:
+        # attendance.user_id unique 인덱스 전에 날짜별 문서를 유저당 1개로 병합
+        merge_legacy_attendance(db)
+        created, failed = ensure_indexes(db)
+        print(f"✅ 인덱스 {len(created)}개 확인/생성")
+        for coll, keys, err in failed:
+            print(f"❌ {coll} {keys}: {err}")
+        if failed:
+            sys.exit(1)
+
+    offenders = find_collscans(db)
+    if offenders:
+        for name, coll, stages in offenders:
+            print(f"❌ COLLSCAN: {name} ({coll}) → {' > '.join(stages)}")
+        sys.exit(1)
+    print("✅ 모든 쿼리 모양이 인덱스를 사용합니다.")
@@ -0,0 +1,25 @@
+# scripts/rebuild_letter_stats_monthly.py
+# letter_stats_monthly(월별 편지/답장 수, KST 기준 월)를 원본 letter/comment에서 다시 계산
+# 사용법:
+#   MONGO_URI=... python scripts/rebuild_letter_stats_monthly.py              → 전체 유저 (첫 조회 때 자동 계산을 미리 해 둠)
+#   MONGO_URI=... python scripts/rebuild_letter_stats_monthly.py <user_id>    → 한 유저만 보정
+# 여러 번 실행해도 안전 (유저별로 재계산, 그 사이 훅 $inc가 들어온 유저는 다시 계산)
+import os, sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from bson import ObjectId
+from utils import report_store
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    user_id = ObjectId(args[0]) if args else None
+    count = report_store.rebuild_monthly_stats(user_id)
+    print(f"✅ letter_stats_monthly {count}건 저장" + (f" (user {user_id})" if user_id else ""))
+
+    # 재계산 후에도 훅의 $inc(rev 포함)가 동작하는지 확인
+    invalid = report_store.invalid_rev_count(user_id)
+    if invalid:
+        print(f"❌ rev가 숫자가 아닌 문서 {invalid}건 (이후 $inc 실패)")
+        sys.exit(1)
@@ -0,0 +1,16 @@
+# scripts/reload_item_catalog.py
+# item_catalog 컬렉션을 직접 수정한 뒤 실행: 캐시 버전을 올려 모든 서버 프로세스가 카탈로그를 다시 로드하게 함
+# 사용법: MONGO_URI=... python scripts/reload_item_catalog.py
+import os, sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from utils import item_catalog
+from utils.config import ITEM_CATALOG_CHECK_SECONDS
+
+if __name__ == "__main__":
+    item_catalog.bump_version()
+    catalog = item_catalog.get_catalog()
+    print(f"✅ 카탈로그 버전 {item_catalog.stats()['version']} (아이템 {len(catalog)}개), "
+          f"각 프로세스에 {ITEM_CATALOG_CHECK_SECONDS:.0f}초 안에 반영됩니다.")
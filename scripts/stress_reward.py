@@ -0,0 +1,144 @@
+# scripts/stress_reward.py
+# grant_point_by_action 동시성 검증: 여러 스레드가 같은 유저에게 동시에 포인트 적립
+#  - 순차 적립과 같은 최종 point/level이 나오는지, 레벨업 횟수와 지급 아이템 수가 맞는지 확인
+# 사용법: MONGO_URI=... python scripts/stress_reward.py [적립 횟수] [스레드 수] [액션]
+# 임시 유저/아이템을 만들고 검증 후 삭제함
+#
+# DB 없이 반복 가능한 검증: python scripts/stress_reward.py --check
+#  - level_up_pipeline을 파이썬으로 평가해 적립/레벨업 결과와 is_level_up 판정을 전수 확인
+#  - 동시 적립은 단일 문서 원자 업데이트이므로 결국 어떤 순서의 순차 적립과 같음
+#    → 여러 적립 순서를 섞어 최종 point/level과 레벨업 판정 수가 일치하는지 확인
+#  - 실제 MongoDB의 원자성 자체는 위 스트레스 모드(라이브 DB)로만 확인 가능
+import os, sys, time, random
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BASE_DIR)
+
+from bson import ObjectId
+from utils.db import db
+from utils.config import POINT_RULES
+from utils.reward import grant_point_by_action, level_up_pipeline, is_level_up, LEVEL_UP_THRESHOLD
+
+
+def expected(n, gain):
+    """순차 적립 시 최종 (point, level, 레벨업 횟수)"""
+    point, level, level_ups = 0, 1, 0
+    for _ in range(n):
+        point += gain
+        if point >= LEVEL_UP_THRESHOLD:
+            point, level, level_ups = 0, level + 1, level_ups + 1
+    return point, level, level_ups
+
+
+def _eval(expr, doc):
+    """level_up_pipeline에서 쓰는 연산자($add/$ifNull/$cond/$gte)만 평가"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if not isinstance(expr, dict):
+        return expr
+    (op, args), = expr.items()
+    if op == "$add":
+        return sum(_eval(a, doc) for a in args)
+    if op == "$ifNull":
+        value = _eval(args[0], doc)
+        return _eval(args[1], doc) if value is None else value
+    if op == "$cond":
+        return _eval(args[1], doc) if _eval(args[0], doc) else _eval(args[2], doc)
+    if op == "$gte":
+        return _eval(args[0], doc) >= _eval(args[1], doc)
+    raise ValueError(f"지원하지 않는 연산자: {op}")
+
+
+def apply_pipeline(doc, pipeline):
+    """$set 스테이지를 순서대로 적용 (스테이지 안의 필드는 적용 전 문서 기준으로 평가)"""
+    for stage in pipeline:
+        doc = {**doc, **{k: _eval(v, doc) for k, v in stage["$set"].items()}}
+    return doc
+
+
+def grant(doc, gain):
+    """find_one_and_update(ReturnDocument.AFTER) 한 번에 해당: (적립 후 문서, 레벨업 여부)"""
+    after = apply_pipeline(doc, level_up_pipeline(gain))
+    return after, is_level_up(after["point"], gain)
+
+
+def check():
+    errors = []
+    gains = sorted(set(POINT_RULES.values()) | {POINT_RULES["write_letter"] + POINT_RULES["long_letter_bonus"]})
+
+    # 1) 단건: 가능한 모든 시작 포인트 × 적립액에서 결과와 레벨업 판정 확인
+    for gain in gains:
+        for start in range(LEVEL_UP_THRESHOLD):
+            after, leveled_up = grant({"point": start, "level": 3}, gain)
+            crossed = start + gain >= LEVEL_UP_THRESHOLD
+            want = {"point": 0 if crossed else start + gain, "level": 4 if crossed else 3}
+            if {"point": after["point"], "level": after["level"]} != want or leveled_up != crossed:
+                errors.append(f"start={start} gain={gain}: {after} leveled_up={leveled_up}")
+
+    # point/level 필드가 없는 기존 유저도 0/1에서 시작
+    after, leveled_up = grant({}, gains[0])
+    if (after["point"], after["level"], leveled_up) != (gains[0], 1, False):
+        errors.append(f"필드 없는 유저: {after} leveled_up={leveled_up}")
+
+    # 2) 연속 적립: 순차 시뮬레이션(expected)과 비교, 레벨업 판정 수 == 레벨 증가량
+    for gain in gains:
+        for n in (1, 9, 10, 11, 500):
+            doc, level_ups = {"point": 0, "level": 1}, 0
+            for _ in range(n):
+                doc, leveled_up = grant(doc, gain)
+                level_ups += leveled_up
+            if (doc["point"], doc["level"], level_ups) != expected(n, gain):
+                errors.append(f"n={n} gain={gain}: {doc} level_ups={level_ups} 기대값 {expected(n, gain)}")
+
+    # 3) 적립액이 섞인 동시 적립 = 임의 순서의 순차 적립: 레벨업 판정 수가 실제 레벨 증가와 일치
+    rng = random.Random(0)
+    for _ in range(200):
+        doc, level_ups = {"point": 0, "level": 1}, 0
+        for gain in rng.choices(gains, k=rng.randint(1, 60)):
+            doc, leveled_up = grant(doc, gain)
+            level_ups += leveled_up
+        if level_ups != doc["level"] - 1 or not 0 <= doc["point"] < LEVEL_UP_THRESHOLD:
+            errors.append(f"섞인 적립: {doc} level_ups={level_ups}")
+
+    for e in errors[:20]:
+        print("FAIL", e)
+    print("OK" if not errors else f"FAIL ({len(errors)}건)")
+    return not errors
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if check() else 1)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    action = sys.argv[3] if len(sys.argv) > 3 else "write_letter"
+    gain = POINT_RULES[action]
+
+    user_id = db.user.insert_one({"nickname": f"stress-{ObjectId()}", "point": 0, "level": 1}).inserted_id
+    try:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda _: grant_point_by_action(user_id, action), range(n)))
+        elapsed = time.perf_counter() - t0
+
+        user = db.user.find_one({"_id": user_id}, {"point": 1, "level": 1})
+        reported_level_ups = sum(1 for ok, r in results if ok and r["leveled_up"])
+        granted_items = sum(len(r["new_items"]) for ok, r in results if ok)
+        item_rows = db.user_item.count_documents({"user_id": user_id})
+        exp_point, exp_level, exp_level_ups = expected(n, gain)
+
+        print(f"{n}회 적립 / {threads} 스레드 / {elapsed:.2f}s ({n / elapsed:.0f}회/s)")
+        print(f"point  : {user.get('point')} (기대값 {exp_point})")
+        print(f"level  : {user.get('level')} (기대값 {exp_level})")
+        print(f"레벨업 : {reported_level_ups} (기대값 {exp_level_ups})")
+        print(f"아이템 : 응답 {granted_items} / user_item {item_rows}")
+
+        ok = (user.get("point") == exp_point and user.get("level") == exp_level
+              and reported_level_ups == exp_level_ups and granted_items == item_rows)
+        print("OK" if ok else "FAIL")
+        sys.exit(0 if ok else 1)
+    finally:
+        db.user_item.delete_many({"user_id": user_id})
+        db.user.delete_one({"_id": user_id})
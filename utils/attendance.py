@@ -89,6 +89,95 @@ def get_today_attendance_doc(user_id):
         {f"days.{day}": 1, "_id": 0}
     )
 
+# ── 예전 날짜별 문서({user_id, date, ...}) → 유저당 문서 1개로 병합 ──
+# attendance.user_id unique 인덱스는 유저당 문서가 하나일 때만 만들 수 있음
+# (scripts/ensure_indexes.py가 인덱스 생성 전에 실행, 트래픽 적을 때 한 번 돌리면 됨)
+_LEGACY_DAY_FIELDS = ("date", "attended", "actions", "counts", "first_action_at", "last_action_at")
+
+def _legacy_day_block(doc):
+    return {
+        "attended": doc.get("attended", True),
+        "actions": doc.get("actions") or [],
+        "counts": doc.get("counts") or {},
+        "first_action_at": doc.get("first_action_at"),
+        "last_action_at": doc.get("last_action_at"),
+    }
+
+def _merge_day_block(a, b):
+    if not a:
+        return b
+    counts = dict(a.get("counts") or {})
+    for k, v in (b.get("counts") or {}).items():
+        counts[k] = counts.get(k, 0) + v
+    firsts = [t for t in (a.get("first_action_at"), b.get("first_action_at")) if t]
+    lasts = [t for t in (a.get("last_action_at"), b.get("last_action_at")) if t]
+    return {
+        "attended": bool(a.get("attended") or b.get("attended")),
+        "actions": sorted(set(a.get("actions") or []) | set(b.get("actions") or [])),
+        "counts": counts,
+        "first_action_at": min(firsts) if firsts else None,
+        "last_action_at": max(lasts) if lasts else None,
+    }
+
+def merge_legacy_attendance(database=None, log=print):
+    """
+    날짜별 문서가 남아 있거나 문서가 여러 개인 유저를 문서 1개(days.<YYYY-MM-DD>)로 병합.
+    남길 문서는 새 형태(date 없음) 우선, 나머지는 find_one_and_delete로 지우면서 내용을 합침.
+    반환: 병합한 유저 수
+    """
+    database = database if database is not None else db
+    coll = database.attendance
+    targets = coll.aggregate([
+        {"$group": {
+            "_id": "$user_id",
+            "n": {"$sum": 1},
+            "legacy": {"$max": {"$cond": [{"$ifNull": ["$date", False]}, 1, 0]}},
+        }},
+        {"$match": {"$or": [{"n": {"$gt": 1}}, {"legacy": 1}]}},
+    ], allowDiskUse=True)
+
+    merged = 0
+    for t in targets:
+        uid = t["_id"]
+        docs = sorted(coll.find({"user_id": uid}), key=lambda d: ("date" in d, d["_id"]))
+        keeper, others = docs[0], docs[1:]
+
+        days = {}
+        if "date" in keeper:
+            days[keeper["date"]] = _legacy_day_block(keeper)
+        for other in others:
+            doc = coll.find_one_and_delete({"_id": other["_id"]})
+            if not doc:
+                continue
+            if "date" in doc:
+                days[doc["date"]] = _merge_day_block(days.get(doc["date"]), _legacy_day_block(doc))
+            for day, block in (doc.get("days") or {}).items():
+                days[day] = _merge_day_block(days.get(day), block)
+
+        # 남긴 문서에 이미 있는 날짜와 합침 (병합 대상 날짜만 덮어씀)
+        for day in days:
+            days[day] = _merge_day_block((keeper.get("days") or {}).get(day), days[day])
+
+        created = [d.get("created_at") or d.get("first_action_at") for d in docs]
+        created = [c for c in created if c]
+        update = {"$set": {
+            **{f"days.{day}": block for day, block in days.items()},
+            "updated_at": datetime.now(timezone.utc),
+        }}
+        if days:
+            update["$addToSet"] = {"days_index": {"$each": sorted(days)}}
+        if created:
+            update["$min"] = {"created_at": min(created)}
+        unset = {f: "" for f in _LEGACY_DAY_FIELDS if f in keeper}
+        if unset:
+            update["$unset"] = unset
+        coll.update_one({"_id": keeper["_id"]}, update)
+        merged += 1
+
+    if merged:
+        log(f"[attendance] 날짜별 문서 병합: 유저 {merged}명")
+    return merged
+
 '''
 KST = pytz.timezone("Asia/Seoul")
 
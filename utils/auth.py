@@ -3,8 +3,9 @@ import json
 from functools import wraps
 from flask import request, Response
 from datetime import datetime, timedelta
-from utils.config import JWT_SECRET_KEY, JWT_ALGORITHM
+from utils.config import JWT_SECRET_KEY, JWT_ALGORITHM, AUTH_VERIFY_USER
 from utils.db import db
+from utils.user_cache import get_profile
 from bson.objectid import ObjectId
 
 # 한글 JSON 응답 헬퍼
@@ -15,8 +16,81 @@ def json_kor(data, status=200):
         status=status
     )
 
+# request.user 기본 프로젝션 (비밀번호 해시는 필요한 핸들러만 명시적으로 요청)
+DEFAULT_USER_PROJECTION = {"password_hash": 0}
+
+
+class LazyUser(dict):
+    """
+    request.user 호환 객체.
+    핸들러가 실제로 필드에 접근할 때 한 번만 프로젝션 조회한다. (_id는 조회 없이 바로 사용 가능)
+    """
+
+    def __init__(self, user_id, projection=None):
+        super().__init__()
+        self._oid = ObjectId(user_id)
+        self._projection = projection or DEFAULT_USER_PROJECTION
+        self.loaded = False
+
+    def _load(self):
+        if not self.loaded:
+            self.loaded = True
+            doc = db.user.find_one({"_id": self._oid}, self._projection) or {}
+            dict.update(self, doc)
+            dict.setdefault(self, "_id", self._oid)
+
+    def __getitem__(self, key):
+        if key == "_id":
+            return self._oid
+        self._load()
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key == "_id":
+            return self._oid
+        self._load()
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self._load()
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self._load()
+        return super().__iter__()
+
+    def __len__(self):
+        self._load()
+        return super().__len__()
+
+    def keys(self):
+        self._load()
+        return super().keys()
+
+    def items(self):
+        self._load()
+        return super().items()
+
+    def values(self):
+        self._load()
+        return super().values()
+
+    def copy(self):
+        self._load()
+        return dict(self)
+
+    def __repr__(self):
+        return f"LazyUser({self._oid}, loaded={self.loaded})"
+
+
 # JWT 인증 데코레이터
-def token_required(f):
+#  - 검증된 토큰의 user_id만으로 request.user_id 설정 (유저 문서 조회 없음)
+#  - 유저 존재 여부는 프로필 캐시로 확인 (AUTH_VERIFY_USER)
+#  - request.user는 핸들러가 접근할 때 지연 조회 → @token_required(user_projection={...})로 필드 지정 가능
+def token_required(f=None, user_projection=None):
+    if f is None:
+        return lambda fn: token_required(fn, user_projection=user_projection)
+
     @wraps(f)
     def decorated(*args, **kwargs):
         auth_header = request.headers.get('Authorization')
@@ -26,14 +100,20 @@ def token_required(f):
         try:
             payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
             user_id = payload["user_id"]
-            user = db.user.find_one({"_id": ObjectId(user_id)})
-            if not user:
-                return json_kor({"error": "사용자를 찾을 수 없습니다."}, 404)
-            request.user = user
-            request.user_id = str(user["_id"])
+            if not ObjectId.is_valid(user_id):
+                raise jwt.InvalidTokenError
+            nickname = payload.get("nickname")
+            if AUTH_VERIFY_USER:
+                profile = get_profile(user_id)
+                if not profile:
+                    return json_kor({"error": "사용자를 찾을 수 없습니다."}, 404)
+                nickname = profile.get("nickname", nickname)
+            request.user = LazyUser(user_id, user_projection)
+            request.user_id = str(user_id)
+            request.nickname = nickname
         except jwt.ExpiredSignatureError:
             return json_kor({"error": "토큰이 만료되었습니다."}, 401)
-        except jwt.InvalidTokenError:
+        except (jwt.InvalidTokenError, KeyError):
             return json_kor({"error": "유효하지 않은 토큰입니다."}, 401)
         return f(*args, **kwargs)
     return decorated
@@ -50,4 +50,118 @@ EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
 APP_BASE_URL = os.getenv("APP_BASE_URL", "https://gominhanyang.vercel.app")
 
 
-MAIL_DEBUG = str(os.getenv("MAIL_DEBUG", "false")).lower() == "true"
\ No newline at end of file
+MAIL_DEBUG = str(os.getenv("MAIL_DEBUG", "false")).lower() == "true"
+
+# 10) 랜덤 편지 수신자 선택
+# $sample로 한 번에 뽑아볼 후보 수 (전체 유저 수와 무관하게 고정 비용)
+RECIPIENT_SAMPLE_SIZE = int(os.getenv("RECIPIENT_SAMPLE_SIZE", "16"))
+# 전화번호 미등록(limited_access) 유저를 랜덤 수신 대상에서 제외할지 여부
+RECIPIENT_EXCLUDE_LIMITED = str(os.getenv("RECIPIENT_EXCLUDE_LIMITED", "false")).lower() == "true"
+# 최근 랜덤 편지를 받은 유저는 이 시간(분) 동안 다시 뽑지 않음 (0이면 사용 안 함)
+RECIPIENT_COOLDOWN_MINUTES = int(os.getenv("RECIPIENT_COOLDOWN_MINUTES", "0"))
+
+# 11) 유저 프로필(닉네임 등) 캐시
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+PROFILE_CACHE_TTL_SECONDS = int(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+# 설정 시 gunicorn 워커 간 공유 캐시(Redis) 사용, 비어 있으면 프로세스 내 LRU 사용
+PROFILE_CACHE_REDIS_URL = os.getenv("PROFILE_CACHE_REDIS_URL", "")
+# Redis 명령 타임아웃(초)과 오류 후 Redis를 건너뛰고 DB로 바로 조회할 시간(초)
+PROFILE_CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv("PROFILE_CACHE_REDIS_TIMEOUT_SECONDS", "0.5"))
+PROFILE_CACHE_REDIS_RETRY_SECONDS   = float(os.getenv("PROFILE_CACHE_REDIS_RETRY_SECONDS", "30"))
+
+# 12) 인덱스
+# 앱 시작 시 utils/indexes.py의 인덱스를 생성할지 여부 (이미 있으면 no-op)
+ENSURE_INDEXES_ON_STARTUP = str(os.getenv("ENSURE_INDEXES_ON_STARTUP", "true")).lower() == "true"
+
+# 13) MongoDB 커넥션 풀 설정
+MONGO_DB_NAME                     = os.getenv("MONGO_DB_NAME", "dev")
+MONGO_MAX_POOL_SIZE               = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE               = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS            = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS          = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS           = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS       = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_READ_PREFERENCE             = os.getenv("MONGO_READ_PREFERENCE", "primary")
+MONGO_WRITE_CONCERN               = os.getenv("MONGO_WRITE_CONCERN", "1")  # 숫자 또는 "majority"
+
+# 14) 편지 후처리 파이프라인 (GPT 제목 생성 등, 요청 경로 밖에서 실행)
+LETTER_PIPELINE_WORKERS = int(os.getenv("LETTER_PIPELINE_WORKERS", "4"))
+TITLE_MAX_RETRIES       = int(os.getenv("TITLE_MAX_RETRIES", "3"))
+TITLE_RETRY_BASE_SECONDS = float(os.getenv("TITLE_RETRY_BASE_SECONDS", "2"))
+# 이 시간(분) 넘게 제목이 확정되지 않은 편지는 워커(main.py)가 다시 처리
+TITLE_STALE_MINUTES     = int(os.getenv("TITLE_STALE_MINUTES", "5"))
+# 감정/주제 라벨: 실패한 편지는 워커가 다시 시도, 이 횟수를 넘으면 빈 라벨로 확정
+LABEL_MAX_ATTEMPTS      = int(os.getenv("LABEL_MAX_ATTEMPTS", "3"))
+LABEL_STALE_MINUTES     = int(os.getenv("LABEL_STALE_MINUTES", "5"))
+
+# 15) OpenAI 응답 캐시 (동일 입력 재호출 방지)
+LLM_CACHE_ENABLED     = str(os.getenv("LLM_CACHE_ENABLED", "true")).lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+
+# 16) 자동 답장 워커 (main.py)
+AUTO_REPLY_CONCURRENCY = int(os.getenv("AUTO_REPLY_CONCURRENCY", "4"))   # 동시 GPT 호출 수
+AUTO_REPLY_BATCH_SIZE  = int(os.getenv("AUTO_REPLY_BATCH_SIZE", "50"))   # bulk_write 단위
+AUTO_REPLY_MAX_RPM     = int(os.getenv("AUTO_REPLY_MAX_RPM", "60"))      # 분당 최대 GPT 호출 (0이면 제한 없음)
+AUTO_REPLY_RATE_LIMIT_RETRIES = int(os.getenv("AUTO_REPLY_RATE_LIMIT_RETRIES", "3"))
+# 편지 선점(lease) 유지 시간: 이 시간 안에 처리되지 않으면 다른 워커가 다시 가져감
+AUTO_REPLY_LEASE_SECONDS = int(os.getenv("AUTO_REPLY_LEASE_SECONDS", "600"))
+# 편지 작성 후 자동 답장까지 대기 시간
+AUTO_REPLY_DELAY_HOURS = int(os.getenv("AUTO_REPLY_DELAY_HOURS", "24"))
+# 스케줄 방식: interval(고정 간격) / due(다음 답장 시각에 기상) /
+#   stream(due + 대기 편지가 없을 때 change stream으로 새 편지 감지, AUTO_REPLY_DELAY_HOURS < REPLY_INTERVAL_HOURS 일 때만 차이 있음)
+AUTO_REPLY_MODE = os.getenv("AUTO_REPLY_MODE", "due")
+REPLY_INTERVAL_HOURS = float(os.getenv("REPLY_INTERVAL_HOURS", "6"))
+# 여러 워커가 동시에 깨어나지 않도록 대기 시간에 더하는 무작위 지연(초)
+AUTO_REPLY_JITTER_SECONDS = float(os.getenv("AUTO_REPLY_JITTER_SECONDS", "30"))
+
+# 17) 인증
+# 토큰 검증 후 유저 존재 여부(탈퇴·삭제)를 프로필 캐시로 확인할지 여부
+AUTH_VERIFY_USER = str(os.getenv("AUTH_VERIFY_USER", "true")).lower() == "true"
+
+# 18) 알림 아웃박스 (메일 발송을 요청 경로 밖에서 처리)
+# 웹 프로세스 안에서 디스패처 스레드를 띄울지 여부
+OUTBOX_DISPATCHER_ENABLED = str(os.getenv("OUTBOX_DISPATCHER_ENABLED", "true")).lower() == "true"
+OUTBOX_POLL_SECONDS       = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))     # 새 알림이 없을 때 재확인 주기
+OUTBOX_MAX_ATTEMPTS       = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))       # 초과 시 dead 처리
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "30"))
+OUTBOX_RETRY_MAX_SECONDS  = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "3600"))
+# 발송 중(sending) 선점 유지 시간: 프로세스가 죽으면 이 시간 후 다른 디스패처가 다시 가져감
+OUTBOX_LEASE_SECONDS      = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+# 같은 수신자의 알림을 이 시간(초) 동안 모아 다이제스트 메일 1통으로 발송
+#  - 기본 0: 지연 없이 바로 발송, 발송 시점에 이미 대기 중인 같은 수신자 알림만 함께 묶음
+#  - 0보다 크면 모든 알림이 최소 이 시간만큼 늦게 나감 (대신 더 많이 묶임)
+NOTIFY_DIGEST_WINDOW_SECONDS = float(os.getenv("NOTIFY_DIGEST_WINDOW_SECONDS", "0"))
+NOTIFY_DIGEST_MAX_EVENTS     = int(os.getenv("NOTIFY_DIGEST_MAX_EVENTS", "20"))   # 다이제스트 1통에 담을 최대 알림 수
+# 처리가 끝난(sent/skipped/dead) 알림 보관 기간(일): completed_at TTL 인덱스로 삭제
+OUTBOX_RETENTION_DAYS        = int(os.getenv("OUTBOX_RETENTION_DAYS", "14"))
+
+# 19) SMTP 커넥션 풀 (EHLO/STARTTLS/로그인 핸드셰이크 재사용)
+SMTP_POOL_SIZE             = int(os.getenv("SMTP_POOL_SIZE", "2"))         # 유지할 최대 유휴 연결 수
+SMTP_TIMEOUT               = float(os.getenv("SMTP_TIMEOUT", "10"))
+# 이 시간(초) 넘게 쉬었던 연결은 재사용 전에 NOOP으로 살아있는지 확인
+SMTP_KEEPALIVE_SECONDS     = float(os.getenv("SMTP_KEEPALIVE_SECONDS", "30"))
+# 이 시간(초) 넘게 쉬었던 연결은 릴레이가 이미 끊었을 가능성이 커서 바로 닫고 새로 연결
+SMTP_MAX_IDLE_SECONDS      = float(os.getenv("SMTP_MAX_IDLE_SECONDS", "240"))
+SMTP_MAX_MESSAGES_PER_CONN = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONN", "100"))
+
+# 20) 아이템 카탈로그 캐시 (프로세스 메모리)
+# 버전(cache_version 컬렉션) 확인 주기: 다른 프로세스에서 bump_version() 한 변경이 이 시간 안에 반영됨
+ITEM_CATALOG_CHECK_SECONDS = float(os.getenv("ITEM_CATALOG_CHECK_SECONDS", "30"))
+# 버전 변경이 없어도 이 시간이 지나면 다시 로드 (bump 없이 DB를 직접 고친 경우 대비)
+ITEM_CATALOG_TTL_SECONDS   = float(os.getenv("ITEM_CATALOG_TTL_SECONDS", "600"))
+
+# 21) 월간 리포트 GPT 분석 병렬 실행
+REPORT_ANALYSIS_WORKERS         = int(os.getenv("REPORT_ANALYSIS_WORKERS", "6"))
+# 분석 1건당 최대 대기 시간(초): 넘으면 해당 항목만 빈 값으로 응답 (백그라운드 결과는 저장되어 다음 조회에 사용)
+REPORT_ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("REPORT_ANALYSIS_TIMEOUT_SECONDS", "25"))
+# 리포트 집계값을 원본에서 다시 맞추는 주기(시간): 훅 실패 등으로 어긋난 값은 이 시간 안에 보정
+REPORT_COUNTS_RESYNC_HOURS      = float(os.getenv("REPORT_COUNTS_RESYNC_HOURS", "24"))
+
+# 22) 편지 감정/주제 분류 (토큰 예산 단위로 나눠 병렬 분류 → 주제 통합)
+CLASSIFIER_BATCH_TOKENS      = int(os.getenv("CLASSIFIER_BATCH_TOKENS", "6000"))    # 배치 1개 프롬프트 토큰 예산
+CLASSIFIER_MAX_LETTER_TOKENS = int(os.getenv("CLASSIFIER_MAX_LETTER_TOKENS", "1500"))  # 편지 1통 최대 (초과분은 잘라냄)
+CLASSIFIER_MAX_BATCH_ITEMS   = int(os.getenv("CLASSIFIER_MAX_BATCH_ITEMS", "40"))
+CLASSIFIER_CONCURRENCY       = int(os.getenv("CLASSIFIER_CONCURRENCY", "4"))
+CLASSIFIER_MAX_TOPICS        = int(os.getenv("CLASSIFIER_MAX_TOPICS", "8"))          # 통합 후 대표 주제 최대 개수
@@ -14,20 +14,175 @@ if not MONGO_URI:
 client = MongoClient(MONGO_URI)
 db = client.get_default_database()  # 기본 데이터베이스 사용"""
 
-from pymongo import MongoClient
 import os
+import threading
+import time
+from pymongo import MongoClient, monitoring
 
 # 로컬 개발 환경에서만 dotenv 사용
 if os.environ.get("FLASK_ENV") != "production":
     from dotenv import load_dotenv
     load_dotenv()
 
+from utils import metrics
+from utils.config import (
+    MONGO_DB_NAME, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_READ_PREFERENCE, MONGO_WRITE_CONCERN
+)
+
 MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
-#<<<<<<< HEAD
-db = client['dev']  # 기본 데이터베이스 사용
-#=======
-#db = client.get_default_database()  # 기본 데이터베이스 사용
 
 
-#>>>>>>> 4ba4669844dec7656428f4c111a015e05fe41362
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """CMAP 이벤트로 커넥션 풀 사용량(체크아웃·대기·타임아웃) 집계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = {
+                "checkouts": 0,
+                "checkins": 0,
+                "checkout_failed": 0,
+                "checkout_timeouts": 0,
+                "connections_created": 0,
+                "connections_closed": 0,
+                "pool_cleared": 0,
+            }
+            self.wait_ms_total = 0.0
+            self.wait_ms_max = 0.0
+
+    def _inc(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _wait_ms(self):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return (time.perf_counter() - started) * 1000 if started else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = self._wait_ms()
+        with self._lock:
+            self.counts["checkouts"] += 1
+            self.wait_ms_total += waited
+            self.wait_ms_max = max(self.wait_ms_max, waited)
+
+    def connection_check_out_failed(self, event):
+        self._wait_ms()
+        with self._lock:
+            self.counts["checkout_failed"] += 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self.counts["checkout_timeouts"] += 1
+
+    def connection_checked_in(self, event):
+        self._inc("checkins")
+
+    def connection_created(self, event):
+        self._inc("connections_created")
+
+    def connection_closed(self, event):
+        self._inc("connections_closed")
+
+    def pool_cleared(self, event):
+        self._inc("pool_cleared")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            s = dict(self.counts)
+            s["in_use"] = s["checkouts"] - s["checkins"]
+            s["wait_ms_avg"] = round(self.wait_ms_total / s["checkouts"], 3) if s["checkouts"] else 0.0
+            s["wait_ms_max"] = round(self.wait_ms_max, 3)
+        s["pid"] = os.getpid()
+        s["max_pool_size"] = MONGO_MAX_POOL_SIZE
+        return s
+
+
+pool_metrics = PoolMetricsListener()
+metrics.register("mongo_pool", pool_metrics.snapshot)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _write_concern():
+    w = MONGO_WRITE_CONCERN
+    return int(w) if w.isdigit() else w
+
+
+def get_client():
+    """
+    프로세스별 MongoClient 반환.
+    gunicorn --preload 처럼 fork 전에 만들어진 클라이언트는 자식 프로세스에서 새로 생성한다.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                    readPreference=MONGO_READ_PREFERENCE,
+                    w=_write_concern(),
+                    event_listeners=[pool_metrics],
+                )
+                _client_pid = pid
+    return _client
+
+
+def get_db():
+    return get_client()[MONGO_DB_NAME]
+
+
+def _after_fork_in_child():
+    # 부모 프로세스의 소켓을 공유하지 않도록 참조만 버림 (다음 접근 시 새로 연결)
+    global _client, _client_pid
+    _client = None
+    _client_pid = None
+    pool_metrics.reset()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class _LazyDatabase:
+    """기존 `from utils.db import db` 사용처 호환용: 접근 시점의 프로세스 클라이언트로 위임"""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+    def __getitem__(self, name):
+        return get_db()[name]
+
+    def __repr__(self):
+        return f"<LazyDatabase {MONGO_DB_NAME}>"
+
+
+db = _LazyDatabase()  # 기본 데이터베이스 사용
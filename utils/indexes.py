@@ -0,0 +1,145 @@
+# utils/indexes.py
+# 라우트가 실제로 사용하는 쿼리 모양에 맞춘 인덱스 정의 + 생성 + explain 기반 COLLSCAN 검사
+#  - 새 쿼리를 추가하면 INDEX_SPECS와 QUERY_SHAPES도 함께 추가할 것
+
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+from utils.db import db
+from utils.config import OUTBOX_RETENTION_DAYS
+
+# (컬렉션, 키, 옵션)
+INDEX_SPECS = [
+    # letter
+    ("letter", [("to", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ("letter", [("from", ASCENDING), ("saved", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ("letter", [("from", ASCENDING), ("status", ASCENDING), ("replied_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ("letter", [("from", ASCENDING), ("created_at", ASCENDING)], {}),
+    ("letter", [("status", ASCENDING), ("created_at", ASCENDING)], {}),
+    ("letter", [("status", ASCENDING), ("lease_expires_at", ASCENDING)],
+     {"partialFilterExpression": {"status": "auto_replying"}}),
+    ("letter", [("title_pending", ASCENDING), ("created_at", ASCENDING)],
+     {"partialFilterExpression": {"title_pending": True}}),
+    ("letter", [("labels_pending", ASCENDING), ("created_at", ASCENDING)],
+     {"partialFilterExpression": {"labels_pending": True}}),
+    # comment
+    ("comment", [("original_letter_id", ASCENDING), ("created_at", ASCENDING)], {}),
+    # 온달 자동 답장은 편지당 하나 (동시에 upsert해도 중복 insert 불가)
+    ("comment", [("original_letter_id", ASCENDING)],
+     {"unique": True, "partialFilterExpression": {"from": "온달"}}),
+    ("comment", [("from", ASCENDING), ("created_at", ASCENDING)], {}),
+    # user
+    ("user", [("nickname", ASCENDING)], {"unique": True, "sparse": True}),
+    ("user", [("email", ASCENDING)], {"unique": True, "sparse": True}),
+    # 아이템
+    ("user_item", [("user_id", ASCENDING), ("item_type", ASCENDING)], {}),
+    # /item/my: 응답 필드를 모두 포함해 커버드 쿼리로 처리
+    ("user_item", [("user_id", ASCENDING), ("category", ASCENDING), ("item_type", ASCENDING),
+                   ("used", ASCENDING), ("_id", ASCENDING)], {}),
+    ("item_catalog", [("name", ASCENDING)], {}),
+    # 출석 (유저당 문서 1개)
+    ("attendance", [("user_id", ASCENDING)], {"unique": True}),
+    # 이메일 인증
+    ("email_verification", [("email", ASCENDING)], {"unique": True}),
+    # 월간 리포트
+    ("report", [("user_id", ASCENDING), ("year", ASCENDING), ("month", ASCENDING)], {"unique": True}),
+    ("letter_stats_monthly", [("user_id", ASCENDING), ("year", ASCENDING), ("month", ASCENDING)], {"unique": True}),
+    # 만족도
+    ("satisfactions", [("letter_id", ASCENDING), ("created_by", ASCENDING), ("phase", ASCENDING)], {}),
+    # OpenAI 응답 캐시 (만료 TTL + 용량 초과 시 오래된 순 삭제)
+    ("llm_cache", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ("llm_cache", [("last_hit_at", ASCENDING)], {}),
+    # 알림 아웃박스 (발송 대기 / lease 만료)
+    ("notification_outbox", [("status", ASCENDING), ("next_attempt_at", ASCENDING)], {}),
+    ("notification_outbox", [("status", ASCENDING), ("lease_expires_at", ASCENDING)],
+     {"partialFilterExpression": {"status": "sending"}}),
+    ("notification_outbox", [("user_id", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING)], {}),
+    # 끝난 알림 보관 기간 (completed_at은 sent/skipped/dead 에만 있음)
+    ("notification_outbox", [("completed_at", ASCENDING)], {"expireAfterSeconds": OUTBOX_RETENTION_DAYS * 86400}),
+]
+
+_SAMPLE_ID = ObjectId()
+_SAMPLE_TS = datetime(2025, 1, 1)
+
+# (이름, 컬렉션, 필터, 정렬) — 각 라우트의 대표 쿼리 모양
+QUERY_SHAPES = [
+    ("letter/random", "letter",
+     {"to": _SAMPLE_ID, "status": "sent", "from": {"$nin": ["volunteer_user", _SAMPLE_ID]}},
+     [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("letter/saved", "letter", {"from": _SAMPLE_ID, "saved": True},
+     [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("letter/replied-to-me", "letter", {"from": _SAMPLE_ID, "status": {"$in": ["replied", "auto_replied"]}},
+     [("replied_at", DESCENDING), ("_id", DESCENDING)]),
+    ("report/monthly letters", "letter", {"from": _SAMPLE_ID, "created_at": {"$gte": _SAMPLE_TS, "$lt": _SAMPLE_TS}}, None),
+    ("auto-reply 대상", "letter", {"status": "sent", "created_at": {"$lte": _SAMPLE_TS}}, None),
+    ("제목 재생성 대상", "letter", {"title_pending": True, "created_at": {"$lte": _SAMPLE_TS}}, None),
+    ("라벨 재분류 대상", "letter", {"labels_pending": True, "created_at": {"$lte": _SAMPLE_TS}},
+     [("created_at", ASCENDING)]),
+    ("auto-reply lease 만료", "letter", {"status": "auto_replying", "lease_expires_at": {"$lte": _SAMPLE_TS}}, None),
+    ("letter replies", "comment", {"original_letter_id": {"$in": [_SAMPLE_ID]}}, [("created_at", ASCENDING)]),
+    ("report/monthly replies", "comment", {"from": _SAMPLE_ID, "created_at": {"$gte": _SAMPLE_TS, "$lt": _SAMPLE_TS}}, None),
+    ("login", "user", {"nickname": "sample"}, None),
+    ("email 중복 확인", "user", {"email": "sample@example.com"}, None),
+    ("item/my", "user_item", {"user_id": _SAMPLE_ID, "category": {"$type": "string"}}, None),
+    ("item/my category", "user_item", {"user_id": _SAMPLE_ID, "category": "sample"}, None),
+    ("item catalog 조회", "item_catalog", {"name": "sample"}, None),
+    ("attendance", "attendance", {"user_id": _SAMPLE_ID}, None),
+    ("email 인증", "email_verification", {"email": "sample@example.com"}, None),
+    ("report comment", "report", {"user_id": _SAMPLE_ID, "year": 2025, "month": 1}, None),
+    ("report/monthly/all", "letter_stats_monthly", {"user_id": _SAMPLE_ID},
+     [("year", ASCENDING), ("month", ASCENDING)]),
+    ("satisfaction 중복 확인", "satisfactions",
+     {"letter_id": str(_SAMPLE_ID), "phase": "after_letter", "created_by": str(_SAMPLE_ID)}, None),
+    ("outbox 발송 대기", "notification_outbox", {"status": "pending", "next_attempt_at": {"$lte": _SAMPLE_TS}},
+     [("next_attempt_at", ASCENDING)]),
+    ("outbox 다이제스트 묶기", "notification_outbox", {"user_id": _SAMPLE_ID, "status": "pending"},
+     [("created_at", ASCENDING)]),
+    ("outbox lease 만료", "notification_outbox", {"status": "sending", "lease_expires_at": {"$lte": _SAMPLE_TS}}, None),
+    ("outbox 상태별 개수", "notification_outbox", {"status": "sent"}, None),
+]
+
+
+def ensure_indexes(database=None, log=print):
+    """INDEX_SPECS를 모두 생성 (이미 있으면 no-op). 실패한 항목은 로그만 남기고 계속 진행."""
+    database = database if database is not None else db
+    created, failed = [], []
+    for coll, keys, options in INDEX_SPECS:
+        try:
+            name = database[coll].create_index(keys, **options)
+            created.append(f"{coll}.{name}")
+        except PyMongoError as e:
+            failed.append((coll, keys, str(e)))
+            log(f"[indexes] {coll} {keys} 생성 실패: {e}")
+    return created, failed
+
+
+def _plan_stages(plan):
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for v in plan.values():
+            stages.extend(_plan_stages(v))
+    elif isinstance(plan, list):
+        for v in plan:
+            stages.extend(_plan_stages(v))
+    return stages
+
+
+def find_collscans(database=None):
+    """
+    QUERY_SHAPES를 explain 해서 winningPlan에 COLLSCAN이 있는 쿼리 목록 반환.
+    반환: [(이름, 컬렉션, 스테이지 목록)]
+    """
+    database = database if database is not None else db
+    offenders = []
+    for name, coll, query, sort in QUERY_SHAPES:
+        cursor = database[coll].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = cursor.explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in stages:
+            offenders.append((name, coll, stages))
+    return offenders
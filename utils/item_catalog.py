@@ -0,0 +1,115 @@
+# utils/item_catalog.py
+# 아이템 카탈로그 메모리 캐시 (전체 목록 + name → 항목 인덱스)
+#  - 카탈로그는 작고 거의 바뀌지 않으므로 프로세스당 한 번 로드해서 재사용
+#  - 무효화: cache_version 컬렉션의 {"_id": "item_catalog", "version": n}
+#    카탈로그를 고친 뒤 bump_version() (또는 scripts/reload_item_catalog.py) 호출 →
+#    각 프로세스가 ITEM_CATALOG_CHECK_SECONDS 안에 버전 변경을 보고 다시 로드
+
+import random
+import threading
+import time
+from utils.db import db
+from utils import metrics
+from utils.config import ITEM_CATALOG_CHECK_SECONDS, ITEM_CATALOG_TTL_SECONDS
+
+VERSION_KEY = "item_catalog"
+FIELDS = {"_id": 0}  # /item/catalog 응답과 같은 모양 (모든 필드)
+
+_lock = threading.Lock()
+_state = {
+    "items": (),          # 카탈로그 원본 순서
+    "by_name": {},        # name → 항목
+    "version": None,
+    "loaded_at": 0.0,
+    "checked_at": 0.0,
+}
+_stats = {"loads": 0, "version_checks": 0, "hits": 0}
+
+
+def _current_version():
+    doc = db.cache_version.find_one({"_id": VERSION_KEY}, {"version": 1})
+    return doc.get("version", 0) if doc else 0
+
+
+def _load(version):
+    items = tuple(db.item_catalog.find({}, FIELDS))
+    by_name = {item["name"]: item for item in items if item.get("name")}
+    now = time.monotonic()
+    _state.update(items=items, by_name=by_name, version=version, loaded_at=now, checked_at=now)
+    _stats["loads"] += 1
+
+
+def _ensure_fresh():
+    now = time.monotonic()
+    with _lock:
+        if _state["version"] is not None and now - _state["loaded_at"] < ITEM_CATALOG_TTL_SECONDS:
+            if now - _state["checked_at"] < ITEM_CATALOG_CHECK_SECONDS:
+                _stats["hits"] += 1
+                return
+            _stats["version_checks"] += 1
+            version = _current_version()
+            if version == _state["version"]:
+                _state["checked_at"] = now
+                return
+        else:
+            version = _current_version()
+        _load(version)
+
+
+def bump_version():
+    """카탈로그 변경 후 호출: 모든 프로세스의 캐시를 무효화"""
+    db.cache_version.update_one({"_id": VERSION_KEY}, {"$inc": {"version": 1}}, upsert=True)
+    invalidate()
+
+
+def invalidate():
+    """이 프로세스의 캐시만 비움 (다음 조회 때 다시 로드)"""
+    with _lock:
+        _state["version"] = None
+
+
+def get_catalog():
+    """전체 카탈로그 (원본 순서, 복사본)"""
+    _ensure_fresh()
+    return [dict(item) for item in _state["items"]]
+
+
+def get_item(name):
+    """name에 해당하는 카탈로그 항목 (없으면 None)"""
+    _ensure_fresh()
+    item = _state["by_name"].get(name)
+    return dict(item) if item else None
+
+
+def get_description(name):
+    item = get_item(name)
+    return item.get("description", "") if item else ""
+
+
+def pick_unowned(owned_names):
+    """
+    보유하지 않은 아이템 중 하나를 무작위로 선택 (없으면 None)
+    보유 수가 적으면 무작위 추출 몇 번으로 끝나고, 많을 때만 여집합을 만들어 고름
+    """
+    _ensure_fresh()
+    names = list(_state["by_name"])
+    owned = set(owned_names)
+    if not names:
+        return None
+    for _ in range(8):
+        name = random.choice(names)
+        if name not in owned:
+            return dict(_state["by_name"][name])
+    pool = [n for n in names if n not in owned]
+    return dict(_state["by_name"][random.choice(pool)]) if pool else None
+
+
+def stats():
+    with _lock:
+        s = dict(_stats)
+        s["size"] = len(_state["items"])
+        s["version"] = _state["version"]
+    return s
+
+
+metrics.register("item_catalog", stats)
@@ -0,0 +1,212 @@
+# utils/letter_classifier.py
+# 편지 감정/주제 분류 (map-reduce)
+#  - map: 편지를 토큰 예산(CLASSIFIER_BATCH_TOKENS) 안에서 배치로 나눠 배치마다 GPT 분류 (병렬)
+#         응답은 편지 번호를 키로 받아 편지 id에 다시 매핑 → 배열 순서가 어긋나도 안전
+#  - reduce: 배치마다 따로 정한 주제 단어를 한 번 더 GPT로 통합 (유사어 → 대표 주제)
+#  - 결과: {letter_id(str): {"emotions": [...], "topic": "..."}}
+
+import json
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from utils.llm_cache import cached_completion
+from utils.config import (
+    CLASSIFIER_BATCH_TOKENS, CLASSIFIER_MAX_LETTER_TOKENS, CLASSIFIER_MAX_BATCH_ITEMS,
+    CLASSIFIER_CONCURRENCY, CLASSIFIER_MAX_TOPICS
+)
+
+EMOTIONS = ["기쁨", "슬픔", "분노", "불안", "지침", "기대", "혼란"]
+
+CLASSIFY_PROMPT = (
+    "다음은 청소년들이 쓴 편지들이며, 각 편지는 [번호]로 시작합니다. 각 편지에 대해 두 가지를 판단하세요. "
+    f"첫째, emotions: 작성자가 느낀 감정을 [{', '.join(EMOTIONS)}] 중에서 하나 이상 선택합니다. "
+    "둘째, topic: 편지의 주제를 한 단어로 간결하게 표현합니다. 유사한 의미는 같은 단어로 통일하고, "
+    "'기타'나 '모르겠음'처럼 불분명한 단어는 쓰지 않습니다. "
+    '출력은 아무 설명 없이 JSON 배열만 반환하세요: [{"id": 번호, "emotions": ["..."], "topic": "..."}]'
+)
+
+MERGE_PROMPT = (
+    "다음은 편지들을 분류한 주제 단어 목록입니다 (괄호 안은 빈도). 의미가 비슷한 단어를 하나로 통합해 "
+    "최대 {max_topics}개의 대표 주제로 정리하세요. 각 대표 주제는 한 단어이며 서로 명확히 구분되어야 합니다. "
+    '출력은 아무 설명 없이 JSON 객체만 반환하세요: {{"원래 단어": "대표 주제", ...}}'
+)
+
+_executor = ThreadPoolExecutor(max_workers=CLASSIFIER_CONCURRENCY, thread_name_prefix="letter-classifier")
+
+try:
+    import tiktoken  # 선택 의존성: 있으면 정확한 토큰 수 사용
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+
+def estimate_tokens(text):
+    """
+    프롬프트 토큰 수 추정
+    tiktoken이 없으면 보수적으로 근사: ASCII 4자당 1토큰, 한글 등 그 외 문자는 1자당 1토큰
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _truncate(text, max_tokens):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # 대략 비율로 자른 뒤 예산 안에 들어올 때까지 줄임
+    cut = max(1, int(len(text) * max_tokens / estimate_tokens(text)))
+    while cut > 1 and estimate_tokens(text[:cut]) > max_tokens:
+        cut = int(cut * 0.9)
+    return text[:cut]
+
+
+def make_batches(letters, budget=CLASSIFIER_BATCH_TOKENS, max_items=CLASSIFIER_MAX_BATCH_ITEMS,
+                 max_letter_tokens=CLASSIFIER_MAX_LETTER_TOKENS):
+    """
+    letters: [(letter_id, content)] → [[(letter_id, content), ...], ...]
+    배치별 (지시문 + 편지들) 토큰 추정치가 budget을 넘지 않도록 순서대로 채움
+    """
+    overhead = estimate_tokens(CLASSIFY_PROMPT)
+    batches, current, used = [], [], overhead
+    for letter_id, content in letters:
+        text = _truncate(content or "", max_letter_tokens)
+        cost = estimate_tokens(text) + 4  # "[번호] " + 구분자
+        if current and (used + cost > budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], overhead
+        current.append((letter_id, text))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_json(text, opener, closer):
+    try:
+        return json.loads(text)
+    except Exception:
+        match = re.search(re.escape(opener) + r".*" + re.escape(closer), text or "", re.S)
+        if match:
+            try:
+                return json.loads(match.group(0))
+            except Exception:
+                return None
+        return None
+
+
+def _is_json_reply(raw):
+    """분류(배열) 또는 주제 통합(객체) 응답으로 파싱되는지 (파싱 안 되는 응답은 캐시하지 않음)"""
+    return isinstance(_parse_json(raw, "[", "]"), list) or isinstance(_parse_json(raw, "{", "}"), dict)
+
+
+def default_llm(prompt, timeout=None, use_cache=True):
+    return cached_completion(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.3,
+        mode="classify",
+        use_cache=use_cache,
+        timeout=timeout,
+        validate=_is_json_reply,
+    ) or ""
+
+
+def _classify_batch(batch, llm):
+    """배치 1개 분류 → {letter_id: {"emotions", "topic"}} (응답에서 빠진 편지는 결과에 없음)"""
+    lines = [f"[{i}] {text}" for i, (_, text) in enumerate(batch, 1)]
+    raw = llm(CLASSIFY_PROMPT + "\n---\n" + "\n---\n".join(lines))
+    parsed = _parse_json(raw, "[", "]")
+    result = {}
+    if not isinstance(parsed, list):
+        return result
+    for row in parsed:
+        if not isinstance(row, dict):
+            continue
+        try:
+            idx = int(row.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= idx < len(batch):
+            continue
+        emotions = row.get("emotions") or []
+        if isinstance(emotions, str):
+            emotions = [emotions]
+        result[str(batch[idx][0])] = {
+            "emotions": [e for e in emotions if e in EMOTIONS],
+            "topic": str(row.get("topic") or "").strip(),
+        }
+    return result
+
+
+def _safe_classify(batch, llm):
+    try:
+        return _classify_batch(batch, llm)
+    except Exception as e:
+        print(f"[classifier] 배치 분류 실패 ({len(batch)}통): {e}")
+        return {}
+
+
+def topic_mapping(topics, llm=None, max_topics=CLASSIFIER_MAX_TOPICS, timeout=None):
+    """
+    reduce: 주제 단어 목록 → {원래 단어: 대표 주제}
+    통합할 게 없으면 {}, GPT 호출/파싱 실패면 None
+    """
+    vocab = Counter(t for t in topics if t)
+    if len(vocab) <= 1:
+        return {}
+    llm = llm or (lambda prompt: default_llm(prompt, timeout=timeout))
+    listing = ", ".join(f"{word}({count})" for word, count in vocab.most_common())
+    try:
+        mapping = _parse_json(llm(MERGE_PROMPT.format(max_topics=max_topics) + "\n" + listing), "{", "}")
+    except Exception as e:
+        print(f"[classifier] 주제 통합 실패: {e}")
+        return None
+    if not isinstance(mapping, dict):
+        return None
+    return {str(k): str(v).strip() for k, v in mapping.items() if v}
+
+
+def merge_topics(labels, llm, max_topics=CLASSIFIER_MAX_TOPICS):
+    """reduce: 주제 단어를 대표 주제로 통합해 labels를 제자리 갱신. 반환: 원래 단어 → 대표 주제"""
+    mapping = topic_mapping([l.get("topic") for l in labels.values()], llm, max_topics) or {}
+    for label in labels.values():
+        label["topic"] = mapping.get(label["topic"], label["topic"])
+    return mapping
+
+
+def classify_letters(letters, llm=None, merge=True, timeout=None, use_cache=True):
+    """
+    letters: [(letter_id, content)]
+    llm: prompt → 응답 문자열 (기본: GPT, 벤치마크/테스트에서는 stub 주입)
+    use_cache: False면 응답 캐시를 건너뜀 (실패한 편지 재시도용, 응답에서 빠진 편지 재시도는 항상 건너뜀)
+    반환: {str(letter_id): {"emotions": [...], "topic": "..."}} — 분류에 실패한 편지는 빈 값
+    """
+    if llm is None:
+        llm = lambda prompt: default_llm(prompt, timeout=timeout, use_cache=use_cache)
+        retry_llm = lambda prompt: default_llm(prompt, timeout=timeout, use_cache=False)
+    else:
+        retry_llm = llm
+    letters = list(letters)
+    if not letters:
+        return {}
+    batches = make_batches(letters)
+    labels = {}
+    for part in _executor.map(lambda b: _safe_classify(b, llm), batches):
+        labels.update(part)
+
+    # 응답에서 빠진 편지는 작은 배치로 한 번만 다시 시도
+    missing = [(lid, text) for batch in batches for lid, text in batch if str(lid) not in labels]
+    if missing:
+        retry = make_batches(missing, max_items=max(1, CLASSIFIER_MAX_BATCH_ITEMS // 4))
+        for part in _executor.map(lambda b: _safe_classify(b, retry_llm), retry):
+            labels.update(part)
+
+    if merge and len(batches) > 1:
+        merge_topics(labels, llm)
+
+    for lid, _ in letters:
+        labels.setdefault(str(lid), {"emotions": [], "topic": ""})
+    return labels
@@ -0,0 +1,146 @@
+# utils/letter_pipeline.py
+# 편지 후처리 파이프라인: 편지는 임시 제목으로 먼저 저장하고, GPT 제목은 백그라운드에서 채운다.
+#  - title_pending: True 인 편지가 처리 대상
+#  - 실패 시 지수 백오프로 재시도, 끝내 실패하면 임시 제목(content[:10])을 최종 제목으로 확정
+#  - 프로세스가 죽어 남은 편지는 main.py 워커가 retry_pending_titles()로 다시 처리
+# 감정/주제 라벨도 같은 방식으로 백그라운드에서 편지 문서에 저장 (ai_emotions, topic)
+#  - labels_pending: True 인 편지가 처리 대상, 리포트는 저장된 라벨만 읽음 (조회 시 GPT 호출 없음)
+#  - 실패한 편지는 워커가 retry_pending_labels()로 여러 통씩 묶어 다시 분류,
+#    LABEL_MAX_ATTEMPTS를 넘으면 빈 라벨로 확정
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from utils.db import db
+from utils.llm_cache import cached_completion
+from utils.letter_classifier import classify_letters
+from utils.config import (
+    LETTER_PIPELINE_WORKERS, TITLE_MAX_RETRIES, TITLE_RETRY_BASE_SECONDS, TITLE_STALE_MINUTES,
+    LABEL_MAX_ATTEMPTS, LABEL_STALE_MINUTES
+)
+
+_executor = ThreadPoolExecutor(max_workers=LETTER_PIPELINE_WORKERS, thread_name_prefix="letter-pipeline")
+
+
+def provisional_title(content):
+    return (content or "")[:10]
+
+
+def request_title(content):
+    """GPT로 제목 생성 (실패 시 예외 발생)"""
+    prompt = f"""
+아래는 사용자가 쓴 편지 내용입니다:
+"{content}"
+
+이 편지의 내용을 함축적으로 잘 요약하고 있는 짧은 제목을 1개 생성해주세요.
+10자 이내로, 핵심 키워드를 담아 응답해주세요.
+"""
+    raw = cached_completion(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": "당신은 제목을 잘 만드는 AI입니다."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=16,
+        mode="title"
+    )
+    title = (raw or "").strip().strip('"')
+    if not title:
+        raise ValueError("empty title")
+    return title
+
+
+def generate_title(letter_id, content):
+    """제목 생성 + 저장 (재시도 포함). 다른 워커가 이미 확정했으면 덮어쓰지 않음."""
+    title = None
+    for attempt in range(TITLE_MAX_RETRIES):
+        try:
+            title = request_title(content)
+            break
+        except Exception as e:
+            print(f"[title] 편지 {letter_id} 제목 생성 실패 ({attempt + 1}/{TITLE_MAX_RETRIES}): {e}")
+            if attempt + 1 < TITLE_MAX_RETRIES:
+                time.sleep(TITLE_RETRY_BASE_SECONDS * (2 ** attempt))
+
+    update = {"title_pending": False, "title_generated_at": datetime.utcnow()}
+    if title:
+        update["title"] = title
+    db.letter.update_one({"_id": letter_id, "title_pending": True}, {"$set": update})
+    return title
+
+
+def schedule_title(letter_id, content):
+    """요청 경로에서 호출: 바로 반환하고 제목 생성은 스레드 풀에서 진행"""
+    _executor.submit(generate_title, letter_id, content)
+
+
+def retry_pending_titles(limit=100):
+    """오래 방치된 title_pending 편지를 다시 처리 (워커 주기 작업)"""
+    threshold = datetime.now() - timedelta(minutes=TITLE_STALE_MINUTES)
+    cursor = db.letter.find(
+        {"title_pending": True, "created_at": {"$lte": threshold}},
+        {"_id": 1, "content": 1}
+    ).limit(limit)
+    count = 0
+    for letter in cursor:
+        generate_title(letter["_id"], letter.get("content", ""))
+        count += 1
+    if count:
+        print(f"{count}건의 미확정 제목을 다시 생성했습니다.")
+    return count
+
+
+def label_letters(letters):
+    """
+    편지 여러 통의 감정/주제 분류 + 저장 (토큰 예산 단위 배치, 편지별 주제를 고정하기 위해 주제 통합은 하지 않음)
+    letters: [{"_id", "content", "label_attempts"(선택)}]. 반환: 라벨을 저장한 편지 수
+    이미 실패한 적 있는 편지가 섞여 있으면 응답 캐시를 건너뛰고 다시 분류
+    """
+    letters = list(letters)
+    if not letters:
+        return 0
+    retrying = any(l.get("label_attempts") for l in letters)
+    try:
+        labels = classify_letters([(l["_id"], l.get("content", "")) for l in letters],
+                                  merge=False, use_cache=not retrying)
+    except Exception as e:
+        print(f"[labels] 편지 {len(letters)}통 분류 실패: {e}")
+        labels = {}
+
+    now = datetime.utcnow()
+    ops, labeled = [], 0
+    for letter in letters:
+        label = labels.get(str(letter["_id"])) or {}
+        attempts = letter.get("label_attempts", 0) + 1
+        if label.get("topic") or label.get("emotions"):
+            update = {"ai_emotions": label.get("emotions", []), "topic": label.get("topic", ""),
+                      "labels_pending": False, "labeled_at": now}
+            labeled += 1
+        elif attempts >= LABEL_MAX_ATTEMPTS:
+            update = {"ai_emotions": [], "topic": "", "labels_pending": False, "labeled_at": now,
+                      "label_attempts": attempts}
+        else:
+            update = {"label_attempts": attempts}
+        ops.append(UpdateOne({"_id": letter["_id"], "labels_pending": True}, {"$set": update}))
+    db.letter.bulk_write(ops, ordered=False)
+    return labeled
+
+
+def schedule_labels(letter_id, content):
+    """요청 경로에서 호출: 바로 반환하고 분류는 스레드 풀에서 진행"""
+    _executor.submit(label_letters, [{"_id": letter_id, "content": content}])
+
+
+def retry_pending_labels(limit=200, stale_minutes=LABEL_STALE_MINUTES):
+    """오래 방치된 labels_pending 편지를 한 번에 묶어 다시 분류 (워커 주기 작업). 반환: 처리 대상 편지 수"""
+    threshold = datetime.now() - timedelta(minutes=stale_minutes)
+    letters = list(db.letter.find(
+        {"labels_pending": True, "created_at": {"$lte": threshold}},
+        {"_id": 1, "content": 1, "label_attempts": 1}
+    ).sort("created_at", 1).limit(limit))
+    if letters:
+        labeled = label_letters(letters)
+        print(f"{len(letters)}건의 미분류 편지 중 {labeled}건의 감정/주제를 저장했습니다.")
+    return len(letters)
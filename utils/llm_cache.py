@@ -0,0 +1,155 @@
+# utils/llm_cache.py
+# OpenAI chat completion 캐시 (MongoDB llm_cache 컬렉션)
+#  - 키: (model, messages 해시, temperature, max_tokens, mode)
+#  - TTL 인덱스(expires_at)로 만료, LLM_CACHE_MAX_ENTRIES 초과 시 오래 안 쓰인 항목부터 삭제
+#  - 의도적으로 매번 달라야 하는 프롬프트는 use_cache=False로 우회
+#  - 응답 형식이 정해진 호출은 validate=로 검사: 통과한 응답만 저장 (형식이 깨진 응답이 TTL 동안 재사용되지 않도록)
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from openai import OpenAI
+from utils.db import db
+from utils import metrics
+from utils.config import LLM_CACHE_ENABLED, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES
+
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# 용량 검사는 저장 N회마다 한 번만
+EVICT_CHECK_EVERY = 100
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypass": 0, "rejected": 0, "store_errors": 0, "saved_latency_ms": 0.0}
+_writes = 0
+
+
+def _count(key, n=1):
+    with _lock:
+        _stats[key] += n
+
+
+def cache_key(model, messages, temperature, max_tokens=None, mode="default"):
+    raw = json.dumps({
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "mode": mode,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _lookup(key):
+    now = datetime.utcnow()
+    return db.llm_cache.find_one_and_update(
+        {"_id": key, "expires_at": {"$gt": now}},
+        {"$inc": {"hits": 1}, "$set": {"last_hit_at": now}},
+        projection={"response": 1, "latency_ms": 1}
+    )
+
+
+def _store(key, model, mode, response, latency_ms, ttl):
+    global _writes
+    now = datetime.utcnow()
+    db.llm_cache.update_one(
+        {"_id": key},
+        {"$set": {
+            "model": model,
+            "mode": mode,
+            "response": response,
+            "latency_ms": latency_ms,
+            "created_at": now,
+            "last_hit_at": now,
+            "expires_at": now + timedelta(seconds=ttl),
+        }, "$setOnInsert": {"hits": 0}},
+        upsert=True
+    )
+    with _lock:
+        _writes += 1
+        check = _writes % EVICT_CHECK_EVERY == 0
+    if check:
+        evict()
+
+
+def _valid(validate, content):
+    if validate is None:
+        return True
+    try:
+        return bool(validate(content))
+    except Exception:
+        return False
+
+
+def evict(max_entries=None):
+    """최대 개수를 넘는 만큼 last_hit_at이 오래된 항목 삭제"""
+    max_entries = LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    excess = db.llm_cache.estimated_document_count() - max_entries
+    if excess <= 0:
+        return 0
+    old_ids = [d["_id"] for d in db.llm_cache.find({}, {"_id": 1}).sort("last_hit_at", 1).limit(excess)]
+    if old_ids:
+        db.llm_cache.delete_many({"_id": {"$in": old_ids}})
+    return len(old_ids)
+
+
+def cached_completion(messages, model="gpt-4o", temperature=0.3, max_tokens=None,
+                      mode="default", use_cache=True, ttl=None, timeout=None, validate=None):
+    """
+    chat.completions.create 결과의 message.content 반환 (API 실패 시 예외 그대로 전달, 실패는 캐시하지 않음)
+    validate: content → bool. False(또는 예외)인 응답은 저장하지 않고, 저장돼 있던 것도 무시하고 다시 호출
+    """
+    use_cache = use_cache and LLM_CACHE_ENABLED
+    key = cache_key(model, messages, temperature, max_tokens, mode) if use_cache else None
+
+    if use_cache:
+        try:
+            doc = _lookup(key)
+        except Exception as e:
+            print(f"[llm_cache] 조회 실패: {e}")
+            doc = None
+            _count("store_errors")
+        if doc and not _valid(validate, doc["response"]):
+            doc = None
+        if doc:
+            _count("hits")
+            _count("saved_latency_ms", doc.get("latency_ms") or 0.0)
+            return doc["response"]
+        _count("misses")
+    else:
+        _count("bypass")
+
+    kwargs = {"model": model, "messages": messages, "temperature": temperature}
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    t0 = time.perf_counter()
+    response = client.chat.completions.create(**kwargs)
+    latency_ms = round((time.perf_counter() - t0) * 1000, 1)
+    content = response.choices[0].message.content
+
+    if use_cache and content and not _valid(validate, content):
+        _count("rejected")
+    elif use_cache and content:
+        try:
+            _store(key, model, mode, content, latency_ms, ttl or LLM_CACHE_TTL_SECONDS)
+        except Exception as e:
+            print(f"[llm_cache] 저장 실패: {e}")
+            _count("store_errors")
+    return content
+
+
+def stats():
+    with _lock:
+        s = dict(_stats)
+    lookups = s["hits"] + s["misses"]
+    s["hit_rate"] = round(s["hits"] / lookups, 4) if lookups else None
+    s["saved_latency_ms"] = round(s["saved_latency_ms"], 1)
+    s["enabled"] = LLM_CACHE_ENABLED
+    return s
+
+
+metrics.register("llm_cache", stats)
@@ -0,0 +1,85 @@
+# utils/llm_fanout.py
+# 서로 독립적인 LLM 분석 여러 개를 스레드 풀에서 동시에 실행 (응답 지연 = 합계 → 최댓값)
+#  - 항목별 타임아웃: 넘으면 그 항목만 기본값으로 대체 (나머지 결과는 그대로 반환)
+#    아직 시작 못 한(풀에서 대기 중인) 항목은 취소 → 떠난 요청의 작업이 다음 요청 앞을 막지 않음
+#  - 단계별 지연시간을 기록해 /metrics(llm_fanout)와 응답 Server-Timing 헤더로 노출
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from utils import metrics
+from utils.config import REPORT_ANALYSIS_WORKERS, REPORT_ANALYSIS_TIMEOUT_SECONDS
+
+_executor = ThreadPoolExecutor(max_workers=REPORT_ANALYSIS_WORKERS, thread_name_prefix="llm-fanout")
+
+_lock = threading.Lock()
+_stages = {}
+
+
+def _record(name, ms, outcome, cancelled=False):
+    with _lock:
+        s = _stages.setdefault(name, {"count": 0, "ok": 0, "timeout": 0, "error": 0, "cancelled": 0,
+                                      "total_ms": 0.0, "max_ms": 0.0})
+        s["count"] += 1
+        s[outcome] += 1
+        s["cancelled"] += int(cancelled)
+        s["total_ms"] += ms
+        s["max_ms"] = max(s["max_ms"], ms)
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - t0) * 1000
+
+
+def run_parallel(tasks, timeout=REPORT_ANALYSIS_TIMEOUT_SECONDS):
+    """
+    tasks: {이름: (함수, 기본값)} — 함수는 인자 없이 호출
+    반환: (results {이름: 값}, timings {이름: {"ms": 지연, "status": ok|timeout|error}})
+    """
+    started = time.perf_counter()
+    futures = {name: _executor.submit(_timed, fn) for name, (fn, _) in tasks.items()}
+    deadline = time.monotonic() + timeout
+    results, timings = {}, {}
+    for name, future in futures.items():
+        default = tasks[name][1]
+        cancelled = False
+        try:
+            value, ms = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            results[name], status = value, "ok"
+        except FutureTimeout:
+            # 대기 중이면 취소, 이미 실행 중이면 그대로 두고(결과 저장은 작업 쪽에서 처리) 기본값으로 응답
+            cancelled = future.cancel()
+            results[name], status = default, "timeout"
+            ms = (time.perf_counter() - started) * 1000
+            print(f"[llm_fanout] {name} {timeout:g}초 초과, 기본값으로 응답" + (" (실행 전 취소)" if cancelled else ""))
+        except Exception as e:
+            results[name], status = default, "error"
+            ms = (time.perf_counter() - started) * 1000
+            print(f"[llm_fanout] {name} 실패: {e}")
+        timings[name] = {"ms": round(ms, 1), "status": status}
+        _record(name, ms, status, cancelled)
+    return results, timings
+
+
+def server_timing(timings, total_ms=None):
+    """Server-Timing 헤더 값 (브라우저 개발자 도구에서 단계별 지연 확인용)"""
+    parts = [f'{name};dur={t["ms"]};desc="{t["status"]}"' for name, t in timings.items()]
+    if total_ms is not None:
+        parts.append(f"total;dur={round(total_ms, 1)}")
+    return ", ".join(parts)
+
+
+def stats():
+    with _lock:
+        out = {}
+        for name, s in _stages.items():
+            out[name] = dict(s)
+            out[name]["avg_ms"] = round(s["total_ms"] / s["count"], 1) if s["count"] else None
+            out[name]["total_ms"] = round(s["total_ms"], 1)
+            out[name]["max_ms"] = round(s["max_ms"], 1)
+    return out
+
+
+metrics.register("llm_fanout", stats)
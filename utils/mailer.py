@@ -1,12 +1,18 @@
 import smtplib, ssl, socket
+import threading
+import time
+from collections import Counter
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr, parseaddr
 from datetime import datetime
+from jinja2 import Environment, DictLoader
 from utils.config import (
     SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD,
-    EMAIL_FROM, EMAIL_USE_TLS, APP_BASE_URL
+    EMAIL_FROM, EMAIL_USE_TLS, APP_BASE_URL,
+    SMTP_POOL_SIZE, SMTP_TIMEOUT, SMTP_KEEPALIVE_SECONDS, SMTP_MAX_IDLE_SECONDS, SMTP_MAX_MESSAGES_PER_CONN
 )
+from utils import metrics
 
 # 이메일 발송 공통 함수
 def _format_from_header(raw_from: str) -> str:
@@ -34,48 +40,262 @@ def _format_to_header(to_email: str) -> str:
 def _bool(v):
     return v if isinstance(v, bool) else str(v).lower() == "true"
 
-def send_email(to_email: str, subject: str, html: str):
-    if not to_email:
-        return False, "no recipient"
-    if not SMTP_HOST:
-        return False, "SMTP_HOST not set"
-    if not SMTP_PORT:
-        return False, "SMTP_PORT not set"
-
+def _build_message(to_email: str, subject: str, html: str) -> MIMEText:
     msg = MIMEText(html, "html", "utf-8")
     msg["Subject"] = str(Header(subject or "", "utf-8"))
     msg["From"] = _format_from_header(EMAIL_FROM or SMTP_USER or "")
     msg["To"] = _format_to_header(to_email)
+    return msg
+
+def _config_error():
+    if not SMTP_HOST:
+        return "SMTP_HOST not set"
+    if not SMTP_PORT:
+        return "SMTP_PORT not set"
+    return None
+
+
+# 재시도해도 결과가 같은 SMTP 거절(5xx)의 err 접두어 (아웃박스에서 바로 dead 처리)
+PERMANENT_PREFIX = "permanent: "
+
+def is_permanent(err) -> bool:
+    return bool(err) and str(err).startswith(PERMANENT_PREFIX)
 
-    try:
+def _response_error(e) -> str:
+    """SMTP 응답 거절 → err 문자열 (5xx면 영구 실패 접두어)"""
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in e.recipients.values()]
+    else:
+        codes = [e.smtp_code]
+    permanent = bool(codes) and all(code >= 500 for code in codes)
+    return (PERMANENT_PREFIX if permanent else "") + str(e)
+
+
+class _Connection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+
+class SMTPPool:
+    """
+    인증까지 끝난 SMTP 연결을 재사용하는 풀
+    - 유휴 연결은 SMTP_KEEPALIVE_SECONDS 넘게 쉬었으면 NOOP으로 확인 후 사용
+    - SMTP_MAX_IDLE_SECONDS 넘게 쉬었거나 SMTP_MAX_MESSAGES_PER_CONN건 보낸 연결은 닫고 새로 연결
+    - 발송 중 연결이 끊기면 새 연결로 한 번 재시도 (수신자/발신자 거절·인증 실패 등 SMTP 응답 오류는 재시도하지 않음)
+    """
+
+    def __init__(self, size=SMTP_POOL_SIZE):
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _connect(self):
         context = ssl.create_default_context()
-        with smtplib.SMTP(SMTP_HOST, int(SMTP_PORT), timeout=10) as smtp:
+        smtp = smtplib.SMTP(SMTP_HOST, int(SMTP_PORT), timeout=SMTP_TIMEOUT)
+        try:
             smtp.ehlo()
             if _bool(EMAIL_USE_TLS):
                 smtp.starttls(context=context)
                 smtp.ehlo()
             if SMTP_USER and SMTP_PASSWORD:
                 smtp.login(SMTP_USER, SMTP_PASSWORD)
-            smtp.sendmail(SMTP_USER, [to_email], msg.as_string())
-        return True, None
-    except Exception as e:
-        return False, str(e)
+        except Exception:
+            self._close(smtp)
+            raise
+        self._count("connects")
+        return _Connection(smtp)
 
-# 메일 템플릿
-def tpl_reply_received(nickname: str, letter_title: str, app_url: str):
-    ts = datetime.now().strftime('%Y-%m-%d %H:%M')
-    return f"""
-    <h3>{nickname}님, 보낸 편지에 <b>답장</b>이 도착했어요.</h3>
-    <p><b>제목:</b> {letter_title}</p>
-    <p><a href="{app_url}/letters/sent">답장 보러가기</a></p>
-    <hr><small>발송시각: {ts}</small>
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _healthy(self, conn):
+        idle = time.monotonic() - conn.last_used
+        if idle > SMTP_MAX_IDLE_SECONDS or conn.sent >= SMTP_MAX_MESSAGES_PER_CONN:
+            return False
+        if idle <= SMTP_KEEPALIVE_SECONDS:
+            return True
+        try:
+            self._count("noops")
+            return conn.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._healthy(conn):
+                self._count("reused")
+                return conn
+            self._count("stale")
+            self._close(conn.smtp)
+
+    def release(self, conn, broken=False):
+        if not broken:
+            conn.last_used = time.monotonic()
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(conn)
+                    return
+        self._close(conn.smtp)
+
+    def _send(self, conn, msg, to_email):
+        conn.smtp.sendmail(SMTP_USER, [to_email], msg.as_string())
+        conn.sent += 1
+
+    def send_many(self, messages):
+        """
+        messages: [(to_email, subject, html)] — 한 연결로 순서대로 발송
+        반환: 입력 순서대로 [(ok, err)]
+        """
+        results = []
+        conn = None
+        try:
+            for to_email, subject, html in messages:
+                if not to_email:
+                    results.append((False, "no recipient"))
+                    continue
+                msg = _build_message(to_email, subject, html)
+                ok, err = False, None
+                for attempt in range(2):
+                    try:
+                        if conn is None:
+                            conn = self.acquire()
+                        self._send(conn, msg, to_email)
+                        ok, err = True, None
+                        break
+                    # SMTPException은 모두 OSError 하위 클래스이므로 SMTP 응답 오류를 먼저 처리
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                        # 서버가 거절 (수신자/발신자/본문/인증): 같은 메일을 다시 보내지 않음, 연결은 그대로 사용
+                        err = _response_error(e)
+                        if is_permanent(err):
+                            self._count("permanent")
+                        break
+                    except smtplib.SMTPServerDisconnected as e:
+                        # 연결 끊김: 버리고 새 연결로 한 번 더
+                        err = str(e)
+                        if conn is not None:
+                            self.release(conn, broken=True)
+                            conn = None
+                        self._count("reconnects")
+                    except smtplib.SMTPException as e:
+                        err = str(e)
+                        if conn is not None:
+                            self.release(conn, broken=True)
+                            conn = None
+                        break
+                    except OSError as e:
+                        # 소켓 오류(timeout, reset 등): 버리고 새 연결로 한 번 더
+                        err = str(e)
+                        if conn is not None:
+                            self.release(conn, broken=True)
+                            conn = None
+                        self._count("reconnects")
+                    except Exception as e:
+                        err = str(e)
+                        if conn is not None:
+                            self.release(conn, broken=True)
+                            conn = None
+                        break
+                self._count("sent" if ok else "failed")
+                results.append((ok, err))
+        finally:
+            if conn is not None:
+                self.release(conn)
+        return results
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn.smtp)
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s["idle"] = len(self._idle)
+        s["size"] = self.size
+        return s
+
+
+pool = SMTPPool()
+metrics.register("smtp_pool", pool.stats)
+
+
+def send_email(to_email: str, subject: str, html: str):
+    if not to_email:
+        return False, "no recipient"
+    err = _config_error()
+    if err:
+        return False, err
+    return pool.send_many([(to_email, subject, html)])[0]
+
+def send_many(messages):
+    """
+    여러 통을 풀의 연결 하나로 연달아 발송 (핸드셰이크 1회)
+    messages: [(to_email, subject, html)], 반환: [(ok, err)]
     """
+    messages = list(messages)
+    err = _config_error()
+    if err:
+        return [(False, err)] * len(messages)
+    return pool.send_many(messages)
+
+# 메일 템플릿 (Jinja2, import 시 한 번만 컴파일 / 변수는 HTML 이스케이프)
+_TEMPLATE_SOURCES = {
+    "reply_received_block.html": """
+    <h3>{{ nickname }}님, 보낸 편지에 <b>답장</b>이 도착했어요.</h3>
+    <p><b>제목:</b> {{ letter_title }}</p>
+    <p><a href="{{ app_url }}/letters/sent">답장 보러가기</a></p>
+    """,
+    "random_received_block.html": """
+    <h3>{{ nickname }}님께 <b>새 편지</b>가 도착했어요 ✉️</h3>
+    <p><b>제목:</b> {{ letter_title }}</p>
+    <p><a href="{{ app_url }}/letters/inbox">편지 보러가기</a></p>
+    """,
+    "reply_received.html": """{% include "reply_received_block.html" %}
+    <hr><small>발송시각: {{ ts }}</small>
+    """,
+    "random_received.html": """{% include "random_received_block.html" %}
+    <hr><small>발송시각: {{ ts }}</small>
+    """,
+    "digest.html": """
+    <h2>{{ nickname }}님께 새 소식 {{ items | length }}건이 도착했어요</h2>
+    {% for item in items %}{% with letter_title = item.letter_title %}{% include item.kind ~ "_block.html" %}{% endwith %}
+    {% if not loop.last %}<hr>{% endif %}{% endfor %}
+    <hr><small>발송시각: {{ ts }}</small>
+    """,
+}
+
+_env = Environment(loader=DictLoader(_TEMPLATE_SOURCES), autoescape=True)
+_templates = {name: _env.get_template(name) for name in _TEMPLATE_SOURCES}
+
+def render(name: str, **context):
+    context.setdefault("ts", datetime.now().strftime('%Y-%m-%d %H:%M'))
+    return _templates[name].render(**context)
+
+def tpl_reply_received(nickname: str, letter_title: str, app_url: str):
+    return render("reply_received.html", nickname=nickname, letter_title=letter_title, app_url=app_url)
 
 def tpl_random_received(nickname: str, letter_title: str, app_url: str):
-    ts = datetime.now().strftime('%Y-%m-%d %H:%M')
-    return f"""
-    <h3>{nickname}님께 <b>새 편지</b>가 도착했어요 ✉️</h3>
-    <p><b>제목:</b> {letter_title}</p>
-    <p><a href="{app_url}/letters/inbox">편지 보러가기</a></p>
-    <hr><small>발송시각: {ts}</small>
-    """
\ No newline at end of file
+    return render("random_received.html", nickname=nickname, letter_title=letter_title, app_url=app_url)
+
+def tpl_digest(nickname: str, items: list, app_url: str):
+    # items: [{"kind": "reply_received" | "random_received", "letter_title": ...}]
+    return render("digest.html", nickname=nickname, items=items, app_url=app_url)
@@ -0,0 +1,25 @@
+# utils/metrics.py
+# 모듈별 지표 수집기 등록소 → GET /metrics 에서 한 번에 조회
+
+import threading
+
+_lock = threading.Lock()
+_providers = {}
+
+
+def register(name, provider):
+    """provider: 인자 없이 호출하면 dict를 반환하는 함수"""
+    with _lock:
+        _providers[name] = provider
+
+
+def snapshot():
+    with _lock:
+        providers = dict(_providers)
+    result = {}
+    for name, provider in providers.items():
+        try:
+            result[name] = provider()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
@@ -0,0 +1,48 @@
+# utils/nickname.py
+# 닉네임 일괄 조회: 응답에 등장하는 모든 id를 모아 프로필 캐시 + $in 쿼리 한 번으로 해결
+
+from bson import ObjectId
+from utils.user_cache import get_profiles
+
+UNKNOWN_NICKNAME = "알 수 없음"
+
+
+def _to_object_id(user_id):
+    """ObjectId로 바꿀 수 있으면 변환, 아니면 None (AI 닉네임 등)"""
+    if isinstance(user_id, ObjectId):
+        return user_id
+    if isinstance(user_id, str) and ObjectId.is_valid(user_id):
+        return ObjectId(user_id)
+    return None
+
+
+def resolve_nicknames(user_ids):
+    """
+    여러 id의 닉네임을 한 번에 조회해서 {원래 id: 닉네임} dict로 반환.
+    - ObjectId로 변환 불가능한 문자열("온달", "volunteer" 등)은 그대로 닉네임으로 사용
+    - 존재하지 않는 유저는 '알 수 없음'
+    """
+    result = {}
+    lookup = {}
+    for uid in user_ids:
+        if uid in result or uid in lookup:
+            continue
+        oid = _to_object_id(uid)
+        if oid is None:
+            result[uid] = uid if isinstance(uid, str) else UNKNOWN_NICKNAME
+        else:
+            lookup[uid] = oid
+
+    if lookup:
+        try:
+            profiles = get_profiles(lookup.values())
+        except Exception:
+            profiles = {}
+        for uid, oid in lookup.items():
+            result[uid] = (profiles.get(oid) or {}).get("nickname", UNKNOWN_NICKNAME)
+    return result
+
+
+def get_nickname(user_id):
+    """단건 조회 (목록 응답에서는 resolve_nicknames 사용)"""
+    return resolve_nicknames([user_id]).get(user_id, UNKNOWN_NICKNAME)
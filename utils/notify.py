@@ -1,57 +1,96 @@
 from bson import ObjectId
 from utils.db import db
-from utils.mailer import send_email, tpl_reply_received, tpl_random_received
+from utils.mailer import send_email, render, tpl_digest
 from utils.config import APP_BASE_URL, MAIL_DEBUG
 
-def notify_reply_received(user_id: str, letter_id: str, debug_mail: bool = MAIL_DEBUG):
-    # email, nickname, email_verified까지 가져오기
-    user = db.user.find_one(
-        {"_id": ObjectId(user_id)},
-        {
+# 재시도해도 결과가 같은 실패 사유 (아웃박스에서 재시도하지 않고 skipped 처리)
+SKIP_REASONS = {
+    "recipient not found or missing email",
+    "email not verified",
+    "email notifications disabled",
+}
+
+# 알림 종류별 메일 제목 (본문은 utils.mailer의 "<kind>.html" 템플릿)
+SUBJECTS = {
+    "reply_received": "보낸 편지에 답장이 도착했어요",
+    "random_received": "새 편지가 도착했어요 ✉️",
+}
+UNTITLED = "(제목 없음)"
+
+def _oid(v):
+    return v if isinstance(v, ObjectId) else ObjectId(str(v))
+
+def build_context(user_id, letter_ids=()):
+    """
+    수신자 정보 + 편지 제목을 한 번의 aggregate로 조회 ($lookup)
+    반환: (user 또는 None, {letter_id: title})
+    """
+    ids = [_oid(l) for l in letter_ids if l and ObjectId.is_valid(str(l))]
+    pipeline = [
+        {"$match": {"_id": _oid(user_id)}},
+        {"$project": {
             "email": 1,
             "nickname": 1,
             "email_verified": 1,
             "email_notify_enabled": 1,
-        }
-    )
+        }},
+    ]
+    if ids:
+        pipeline.append({"$lookup": {
+            "from": "letter",
+            "pipeline": [{"$match": {"_id": {"$in": ids}}}, {"$project": {"title": 1}}],
+            "as": "letters",
+        }})
+    user = next(db.user.aggregate(pipeline), None)
+    if not user:
+        return None, {}
+    titles = {str(l["_id"]): l.get("title") for l in user.pop("letters", [])}
+    return user, titles
+
+def _check_recipient(user):
+    """메일 받을 수 있는 유저면 None, 아니면 사유"""
     if not user or not user.get("email"):
-        return False, "recipient not found or missing email"
+        return "recipient not found or missing email"
 
     # 이메일 인증 안 된 경우: 메일 보내지 않음
     if not user.get("email_verified"):
-        return False, "email not verified"
-    
+        return "email not verified"
+
     # 이메일 알림 동의 안 한 경우: 메일 보내지 않음
     if not user.get("email_notify_enabled", False):
-        return False, "email notifications disabled"
+        return "email notifications disabled"
+    return None
+
+def _notify(kind, user_id, letter_id):
+    user, titles = build_context(user_id, [letter_id])
+    reason = _check_recipient(user)
+    if reason:
+        return False, reason
+    html = render(f"{kind}.html",
+                  nickname=user.get("nickname", ""),
+                  letter_title=titles.get(str(letter_id)) or UNTITLED,
+                  app_url=APP_BASE_URL)
+    return send_email(user["email"], SUBJECTS[kind], html)
 
-    # letter_id로 실제 제목 가져오고 싶으면 여기서 조회해도 됨
-    html = tpl_reply_received(user.get("nickname", ""), "(제목)", APP_BASE_URL)
-    ok, err = send_email(user["email"], "보낸 편지에 답장이 도착했어요", html)
-    return ok, err
+def notify_reply_received(user_id: str, letter_id: str, debug_mail: bool = MAIL_DEBUG):
+    return _notify("reply_received", user_id, letter_id)
 
 def notify_random_received(user_id: str, letter_id: str, debug_mail: bool = MAIL_DEBUG):
-    # email, nickname, email_verified, email_notify_enabled까지 가져오기
-    user = db.user.find_one(
-        {"_id": ObjectId(user_id)},
-        {
-            "email": 1,
-            "nickname": 1,
-            "email_verified": 1,
-            "email_notify_enabled": 1,
-        }
-    )
-    if not user or not user.get("email"):
-        return False, "recipient not found or missing email"
+    return _notify("random_received", user_id, letter_id)
 
-    # 이메일 인증 안 된 경우: 메일 보내지 않음
-    if not user.get("email_verified"):
-        return False, "email not verified"
-    
-    # 이메일 알림 동의 안 한 경우: 메일 보내지 않음
-    if not user.get("email_notify_enabled", False):
-        return False, "email notifications disabled"
+def notify_digest(user_id: str, events: list, debug_mail: bool = MAIL_DEBUG):
+    """
+    같은 수신자에게 모인 알림 여러 건을 메일 한 통으로 발송
+    events: [{"kind": ..., "letter_id": ...}] (1건이면 일반 알림과 같은 메일)
+    """
+    if len(events) == 1:
+        return _notify(events[0]["kind"], user_id, events[0].get("letter_id"))
 
-    html = tpl_random_received(user.get("nickname", ""), "(제목)", APP_BASE_URL)
-    ok, err = send_email(user["email"], "새 편지가 도착했어요 ✉️", html)
-    return ok, err
\ No newline at end of file
+    user, titles = build_context(user_id, [e.get("letter_id") for e in events])
+    reason = _check_recipient(user)
+    if reason:
+        return False, reason
+    items = [{"kind": e["kind"], "letter_title": titles.get(str(e.get("letter_id"))) or UNTITLED}
+             for e in events]
+    html = tpl_digest(user.get("nickname", ""), items, APP_BASE_URL)
+    return send_email(user["email"], f"새 소식 {len(events)}건이 도착했어요 ✉️", html)
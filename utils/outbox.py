@@ -0,0 +1,220 @@
+# utils/outbox.py
+# 알림 아웃박스: 요청 경로에서는 notification_outbox에 한 건 insert만 하고, 메일 발송은 디스패처 스레드가 처리
+#  - 상태: pending → sending → sent / skipped(수신 거부·미인증 등) / dead(재시도 초과 또는 SMTP 5xx 거절)
+#  - 실패 시 지수 백오프(OUTBOX_RETRY_BASE_SECONDS * 2^n, 최대 OUTBOX_RETRY_MAX_SECONDS)로 next_attempt_at 갱신
+#  - sending 상태는 lease_expires_at까지만 유효 → 프로세스가 죽어도 다른 디스패처가 다시 가져감
+#  - 다이제스트: 새 알림은 NOTIFY_DIGEST_WINDOW_SECONDS 뒤(기본 0 → 즉시)에 발송 예정으로 적재하고,
+#    발송 시점에 같은 수신자의 대기 알림을 함께 선점해 메일 1통(notify_digest)으로 보냄
+#  - 끝난 알림(sent/skipped/dead)은 completed_at 기준 OUTBOX_RETENTION_DAYS 뒤 TTL 인덱스로 삭제
+
+import os
+import random
+import socket
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from utils.db import db
+from utils import metrics
+from utils.notify import notify_digest, SUBJECTS, SKIP_REASONS
+from utils.mailer import is_permanent
+from utils.config import (
+    OUTBOX_POLL_SECONDS, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE_SECONDS,
+    OUTBOX_RETRY_MAX_SECONDS, OUTBOX_LEASE_SECONDS, OUTBOX_DISPATCHER_ENABLED,
+    NOTIFY_DIGEST_WINDOW_SECONDS, NOTIFY_DIGEST_MAX_EVENTS
+)
+
+STATUSES = ("pending", "sending", "sent", "skipped", "dead")
+
+
+_wake = threading.Event()
+_lock = threading.Lock()
+_counters = Counter()
+_dispatcher = {"pid": None, "thread": None}
+
+
+def dispatcher_id():
+    # fork된 워커마다 달라야 하므로 호출 시점의 pid 사용
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _count(key, n=1):
+    with _lock:
+        _counters[key] += n
+
+
+def enqueue(kind, user_id, letter_id=None):
+    """알림 한 건 적재 후 디스패처를 깨움 (발송 결과를 기다리지 않음)"""
+    if kind not in SUBJECTS:
+        raise ValueError(f"unknown notification kind: {kind}")
+    now = datetime.utcnow()
+    doc = {
+        "kind": kind,
+        "user_id": user_id,
+        "letter_id": letter_id,
+        "status": "pending",
+        "attempts": 0,
+        # 다이제스트 창(기본 0)이 끝날 때까지 같은 수신자의 알림을 모음
+        "next_attempt_at": now + timedelta(seconds=NOTIFY_DIGEST_WINDOW_SECONDS),
+        "created_at": now,
+    }
+    db.notification_outbox.insert_one(doc)
+    _count("enqueued")
+    if OUTBOX_DISPATCHER_ENABLED:
+        start_dispatcher()
+    _wake.set()
+    return doc["_id"]
+
+
+def retry_delay(attempts):
+    """attempts번 실패한 뒤 다음 시도까지 대기 시간(초), 같은 시각에 몰리지 않도록 ±10% 지터"""
+    delay = min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.9, 1.1)
+
+
+def claim_one(owner=None):
+    """발송할 알림 한 건을 원자적으로 선점 (기한이 된 pending 또는 lease가 만료된 sending)"""
+    owner = owner or dispatcher_id()
+    now = datetime.utcnow()
+    return db.notification_outbox.find_one_and_update(
+        {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "sending", "lease_expires_at": {"$lte": now}},
+        ]},
+        {"$set": {
+            "status": "sending",
+            "lease_owner": owner,
+            "lease_expires_at": now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+        }},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def claim_batch(owner=None):
+    """
+    발송 기한이 된 알림 1건 + 같은 수신자의 나머지 대기 알림을 함께 선점
+    반환: 선점한 알림 목록 (첫 항목이 기한이 된 알림), 없으면 []
+    """
+    owner = owner or dispatcher_id()
+    lead = claim_one(owner)
+    if not lead:
+        return []
+    sibling_ids = [d["_id"] for d in db.notification_outbox.find(
+        {"user_id": lead["user_id"], "status": "pending"}, {"_id": 1}
+    ).sort("created_at", 1).limit(max(NOTIFY_DIGEST_MAX_EVENTS - 1, 0))]
+    if not sibling_ids:
+        return [lead]
+    # 다른 디스패처가 먼저 가져간 항목은 status 조건에서 걸러짐
+    db.notification_outbox.update_many(
+        {"_id": {"$in": sibling_ids}, "status": "pending"},
+        {"$set": {
+            "status": "sending",
+            "lease_owner": owner,
+            "lease_expires_at": lead["lease_expires_at"],
+            "batch_id": lead["_id"],
+        }}
+    )
+    siblings = db.notification_outbox.find(
+        {"_id": {"$in": sibling_ids}, "batch_id": lead["_id"], "lease_owner": owner}
+    ).sort("created_at", 1)
+    return [lead] + list(siblings)
+
+
+def deliver(batch, owner=None):
+    """선점한 (같은 수신자의) 알림 묶음을 메일 1통으로 발송 후 결과 상태 기록. 반환: 최종 상태"""
+    owner = owner or dispatcher_id()
+    lead = batch[0]
+    events = [{"kind": d["kind"], "letter_id": d.get("letter_id")} for d in batch]
+    try:
+        ok, err = notify_digest(str(lead["user_id"]), events)
+    except Exception as e:
+        ok, err = False, str(e)
+
+    now = datetime.utcnow()
+    attempts = max(d.get("attempts", 0) for d in batch) + 1
+    update = {"attempts": attempts, "last_attempt_at": now, "last_error": err}
+    if ok:
+        update.update({"status": "sent", "sent_at": now, "completed_at": now})
+    elif err in SKIP_REASONS:
+        update.update({"status": "skipped", "completed_at": now})
+    elif attempts >= OUTBOX_MAX_ATTEMPTS or is_permanent(err):
+        update.update({"status": "dead", "completed_at": now})
+        print(f"[outbox] 알림 {[str(d['_id']) for d in batch]} dead 처리: {err}")
+    else:
+        update.update({
+            "status": "pending",
+            "next_attempt_at": now + timedelta(seconds=retry_delay(attempts)),
+        })
+        _count("retried", len(batch))
+
+    # 그 사이 lease가 만료돼 다른 디스패처가 가져갔다면 덮어쓰지 않음
+    db.notification_outbox.update_many(
+        {"_id": {"$in": [d["_id"] for d in batch]}, "lease_owner": owner},
+        {"$set": update, "$unset": {"lease_owner": "", "lease_expires_at": "", "batch_id": ""}}
+    )
+    if update["status"] != "pending":
+        _count(update["status"], len(batch))
+    if ok and len(batch) > 1:
+        _count("digests")
+        _count("coalesced", len(batch) - 1)
+    return update["status"]
+
+
+def dispatch_once(owner=None, limit=100):
+    """지금 발송 가능한 알림 묶음을 최대 limit개 처리. 반환: 처리한 알림 수"""
+    owner = owner or dispatcher_id()
+    count = 0
+    for _ in range(limit):
+        batch = claim_batch(owner)
+        if not batch:
+            break
+        deliver(batch, owner)
+        count += len(batch)
+    return count
+
+
+def next_attempt_at():
+    """가장 빠른 재시도 예정 시각 (없으면 None)"""
+    doc = db.notification_outbox.find_one(
+        {"status": "pending"}, {"next_attempt_at": 1}, sort=[("next_attempt_at", 1)]
+    )
+    return doc["next_attempt_at"] if doc else None
+
+
+def _run_dispatcher():
+    while True:
+        _wake.clear()
+        try:
+            dispatch_once()
+            timeout = OUTBOX_POLL_SECONDS
+            due = next_attempt_at()
+            if due:
+                timeout = max(0.0, min(timeout, (due - datetime.utcnow()).total_seconds()))
+        except Exception as e:
+            print(f"[outbox] 디스패처 오류: {e}")
+            timeout = OUTBOX_POLL_SECONDS
+        _wake.wait(timeout)
+
+
+def start_dispatcher():
+    """프로세스당 디스패처 스레드 1개 시작 (fork된 gunicorn 워커에서는 다시 시작)"""
+    with _lock:
+        if _dispatcher["pid"] == os.getpid() and _dispatcher["thread"].is_alive():
+            return _dispatcher["thread"]
+        t = threading.Thread(target=_run_dispatcher, name="outbox-dispatcher", daemon=True)
+        t.start()
+        _dispatcher.update(pid=os.getpid(), thread=t)
+        return t
+
+
+def stats():
+    # 상태별로 (status, next_attempt_at) 인덱스 범위만 셈 (컬렉션 전체 $group 없음)
+    by_status = {s: db.notification_outbox.count_documents({"status": s}) for s in STATUSES}
+    with _lock:
+        counters = dict(_counters)
+        alive = _dispatcher["pid"] == os.getpid() and bool(_dispatcher["thread"]) and _dispatcher["thread"].is_alive()
+    return {"by_status": by_status, "process": counters, "dispatcher_alive": alive}
+
+
+metrics.register("notification_outbox", stats)
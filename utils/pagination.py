@@ -0,0 +1,67 @@
+# utils/pagination.py
+# 키셋(커서) 페이지네이션: (정렬 필드, _id) 내림차순 기준
+#  - cursor는 마지막 항목의 (정렬 필드 값, _id)를 base64로 감싼 불투명 문자열
+#  - limit은 PAGE_SIZE를 넘을 수 없음
+
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from utils.config import PAGE_SIZE
+
+
+def parse_limit(args):
+    limit = args.get("limit", type=int) or PAGE_SIZE
+    return max(1, min(limit, PAGE_SIZE))
+
+
+def encode_cursor(value, oid):
+    raw = {"t": value.isoformat() if isinstance(value, datetime) else None, "id": str(oid)}
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(datetime 또는 None, ObjectId) 반환, 형식이 잘못되면 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        value = datetime.fromisoformat(raw["t"]) if raw.get("t") else None
+        return value, ObjectId(raw["id"])
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def _after(field, value, oid):
+    """내림차순 정렬에서 커서 다음 항목 조건 (값이 없는 문서는 맨 뒤에 위치)"""
+    if value is None:
+        return {field: None, "_id": {"$lt": oid}}
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "_id": {"$lt": oid}},
+        {field: None},
+    ]}
+
+
+def paginate(collection, query, projection, field, args):
+    """
+    query 결과를 field 내림차순으로 한 페이지만 조회.
+    반환: (items, next_cursor) — 마지막 페이지면 next_cursor는 None
+    잘못된 cursor면 ValueError
+    """
+    limit = parse_limit(args)
+    cursor = args.get("cursor")
+    if cursor:
+        value, oid = decode_cursor(cursor)
+        query = {"$and": [query, _after(field, value, oid)]}
+
+    items = list(
+        collection.find(query, projection)
+        .sort([(field, -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last.get(field), last["_id"])
+    return items, next_cursor
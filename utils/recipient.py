@@ -0,0 +1,64 @@
+# utils/recipient.py
+# 랜덤 편지 수신자 선택기
+#  - 전체 유저 id를 불러오지 않고, $sample(첫 스테이지)로 소수 후보만 뽑은 뒤 서버에서 조건 필터링
+#  - 후보가 모두 걸러지는 드문 경우에만 조건 매칭 후 샘플링으로 fallback
+
+from datetime import datetime, timedelta
+from utils.db import db
+from utils.config import (
+    RECIPIENT_SAMPLE_SIZE, RECIPIENT_EXCLUDE_LIMITED, RECIPIENT_COOLDOWN_MINUTES
+)
+
+# 빠른 경로($sample 우선) 재시도 횟수
+SAMPLE_ATTEMPTS = 2
+
+
+def _eligible_filter(sender, now):
+    cond = {
+        "_id": {"$ne": sender},
+        # 랜덤 편지 수신 거부한 유저 제외
+        "random_letter_opt_out": {"$ne": True},
+    }
+    if RECIPIENT_EXCLUDE_LIMITED:
+        cond["limited_access"] = {"$ne": True}
+    if RECIPIENT_COOLDOWN_MINUTES > 0:
+        cutoff = now - timedelta(minutes=RECIPIENT_COOLDOWN_MINUTES)
+        cond["last_random_received_at"] = {"$not": {"$gte": cutoff}}
+    return cond
+
+
+def pick_random_recipient(sender, users=None):
+    """
+    sender를 제외한 수신 가능 유저 1명의 _id를 반환 (없으면 None).
+    $sample이 첫 스테이지일 때 MongoDB는 랜덤 커서를 사용하므로 비용이 유저 수와 무관하다.
+    """
+    users = users if users is not None else db.user
+    now = datetime.utcnow()
+    cond = _eligible_filter(sender, now)
+
+    picked = None
+    for _ in range(SAMPLE_ATTEMPTS):
+        docs = list(users.aggregate([
+            {"$sample": {"size": RECIPIENT_SAMPLE_SIZE}},
+            {"$match": cond},
+            {"$limit": 1},
+            {"$project": {"_id": 1}},
+        ]))
+        if docs:
+            picked = docs[0]["_id"]
+            break
+
+    if picked is None:
+        # 후보 대부분이 제외 대상인 경우 (소규모 DB 등) → 조건 매칭 후 샘플링
+        docs = list(users.aggregate([
+            {"$match": cond},
+            {"$sample": {"size": 1}},
+            {"$project": {"_id": 1}},
+        ]))
+        if not docs:
+            return None
+        picked = docs[0]["_id"]
+
+    if RECIPIENT_COOLDOWN_MINUTES > 0:
+        users.update_one({"_id": picked}, {"$set": {"last_random_received_at": now}})
+    return picked
@@ -0,0 +1,289 @@
+# utils/report_store.py
+# 월간 리포트 materialize: report 컬렉션의 (user_id, year, month) 문서에 집계값과 GPT 분석 결과를 저장
+#  - 집계(letters_count, replies_count, replied_count, selected_emotion_count)는 편지/답장 작성 시 $inc로 갱신
+#  - 훅 도입 전 데이터가 있는 달은 처음 조회할 때 원본에서 다시 계산 (counts_built 플래그),
+#    이후에도 REPORT_COUNTS_RESYNC_HOURS 지난 문서는 조회 시 다시 계산 (counts_built_at)
+#  - GPT 분석은 analysis.<이름> 에 {value, fingerprint}로 저장, 입력(요약 프롬프트 등)이 바뀐 경우에만 재계산
+#  - 편지별 감정/주제 라벨은 편지 문서에 저장된 값(utils.letter_pipeline)을 그대로 읽음
+#  - 월 구분은 기존 리포트 쿼리와 같이 created_at(서버 시각)의 연/월 기준
+# 월별 추이(letter_stats_monthly): 같은 쓰기 훅에서 (user_id, year, month) 문서에 함께 $inc
+#  - 월 구분은 출석과 같은 Asia/Seoul 기준 (저장된 naive created_at은 UTC로 해석, MongoDB와 동일)
+#  - 훅 도입 전 데이터는 유저별로 처음 조회할 때 원본에서 한 번 계산 (built 표시 문서: year=0, month=0)
+#    scripts/rebuild_letter_stats_monthly.py 로 전체를 미리 채우거나 다시 맞출 수 있음
+#  - 훅은 rev도 함께 $inc → 재계산은 rev가 그대로인 문서에만 덮어씀 (동시 $inc 유실 방지)
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+import pytz
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from utils.db import db
+from utils.config import REPORT_COUNTS_RESYNC_HOURS
+
+COUNT_FIELDS = ("letters_count", "replies_count", "replied_count")
+
+KST = pytz.timezone("Asia/Seoul")
+
+
+def month_range(year, month):
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def _key(user_id, year, month):
+    return {"user_id": user_id, "year": year, "month": month}
+
+
+def _safe_key(value):
+    # 필드 이름으로 쓸 수 없는 문자('.', 선두 '$') 방지
+    return str(value).replace(".", "_").lstrip("$")
+
+
+def kst_month(when):
+    """created_at → Asia/Seoul 기준 (year, month)"""
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    local = when.astimezone(KST)
+    return local.year, local.month
+
+
+def _inc(user_id, when, inc):
+    """집계 필드 증가. 쓰기 경로를 막지 않도록 실패는 로그만 남김 (REPORT_COUNTS_RESYNC_HOURS 안에 재계산으로 보정)"""
+    # AI/시스템 발신자("온달" 등 문자열)는 리포트 대상이 아님
+    if isinstance(user_id, ObjectId) and when:
+        now = datetime.utcnow()
+        try:
+            db.report.update_one(
+                _key(user_id, when.year, when.month),
+                {"$inc": inc, "$set": {"updated_at": now}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"[report_store] 집계 갱신 실패 ({user_id}, {when:%Y-%m}): {e}")
+        try:
+            db.letter_stats_monthly.update_one(
+                _key(user_id, *kst_month(when)),
+                {"$inc": {**{k: v for k, v in inc.items() if k in COUNT_FIELDS}, "rev": 1},
+                 "$set": {"updated_at": now}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"[report_store] 월별 추이 갱신 실패 ({user_id}, {when:%Y-%m}): {e}")
+
+
+# ---- 쓰기 훅 ----
+
+def on_letter_created(user_id, created_at, emotion=None):
+    inc = {"letters_count": 1}
+    if emotion:
+        inc[f"selected_emotion_count.{_safe_key(emotion)}"] = 1
+    _inc(user_id, created_at, inc)
+
+
+def on_reply_created(user_id, created_at):
+    _inc(user_id, created_at, {"replies_count": 1})
+
+
+def on_letter_replied(sender_id, letter_created_at):
+    """편지가 사용자 답장으로 replied 상태가 됨 → 편지 작성자의 작성 월에 집계"""
+    _inc(sender_id, letter_created_at, {"replied_count": 1})
+
+
+# ---- 조회 ----
+
+def rebuild_counts(user_id, year, month):
+    """원본 letter/comment에서 그 달 집계를 다시 계산해 저장"""
+    start, end = month_range(year, month)
+    created = {"$gte": start, "$lt": end}
+    emotions = {}
+    letters_count = 0
+    for row in db.letter.aggregate([
+        {"$match": {"from": user_id, "created_at": created}},
+        {"$group": {"_id": "$emotion", "count": {"$sum": 1}}},
+    ]):
+        letters_count += row["count"]
+        if row["_id"]:
+            emotions[_safe_key(row["_id"])] = row["count"]
+    counts = {
+        "letters_count": letters_count,
+        "replies_count": db.comment.count_documents({"from": user_id, "created_at": created}),
+        "replied_count": db.letter.count_documents({"from": user_id, "status": "replied", "created_at": created}),
+        "selected_emotion_count": emotions,
+    }
+    db.report.update_one(
+        _key(user_id, year, month),
+        {"$set": {**counts, "counts_built": True, "counts_built_at": datetime.utcnow(), "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return counts
+
+
+def _user_month_counts(user_id):
+    """원본 letter/comment에서 유저의 KST 월별 집계 → {(year, month): {필드: 수}}"""
+    month_id = {
+        "year": {"$year": {"date": "$created_at", "timezone": KST.zone}},
+        "month": {"$month": {"date": "$created_at", "timezone": KST.zone}},
+    }
+    rows = {}
+    for collection, extra, field in (
+        ("letter", {}, "letters_count"),
+        ("comment", {}, "replies_count"),
+        ("letter", {"status": "replied"}, "replied_count"),
+    ):
+        for row in db[collection].aggregate([
+            {"$match": {"from": user_id, "created_at": {"$type": "date"}, **extra}},
+            {"$group": {"_id": month_id, "count": {"$sum": 1}}},
+        ]):
+            key = (row["_id"]["year"], row["_id"]["month"])
+            rows.setdefault(key, {f: 0 for f in COUNT_FIELDS})[field] = row["count"]
+    return rows
+
+
+def _rebuild_op(user_id, key, exists, rev, counts, now):
+    """
+    재계산 결과 쓰기 (rev는 항상 숫자로 남겨야 훅의 $inc가 동작함)
+    - 있던 달: 읽었던 rev와 같을 때만 덮어씀 (rev가 없던 문서는 0으로 맞춤)
+    - 없던 달: rev 없는 문서로 upsert, 새로 만들 때 rev=0 (그 사이 훅이 만든 문서가 있으면 중복 키 → 충돌)
+    """
+    if exists:
+        update = {"$set": {**counts, "updated_at": now}}
+        if rev is None:
+            update["$set"]["rev"] = 0
+        return UpdateOne({**_key(user_id, *key), "rev": rev}, update, upsert=True)
+    return UpdateOne({**_key(user_id, *key), "rev": {"$exists": False}},
+                     {"$set": {**counts, "updated_at": now}, "$setOnInsert": {"rev": 0}}, upsert=True)
+
+
+def invalid_rev_count(user_id=None):
+    """rev가 숫자가 아닌 월 문서 수 (0이 아니면 훅 $inc가 실패하는 문서가 있음)"""
+    query = {"year": {"$gt": 0}, "rev": {"$not": {"$type": "number"}}}
+    if user_id:
+        query["user_id"] = user_id
+    return db.letter_stats_monthly.count_documents(query)
+
+
+def rebuild_user_monthly_stats(user_id, retries=3):
+    """
+    한 유저의 letter_stats_monthly를 원본에서 다시 계산해 저장 (낙관적 동시성)
+    - 재계산 전에 읽은 rev와 같은 문서에만 $set → 그 사이 훅 $inc가 있었던 달은 충돌로 보고 다시 계산
+    - 원본에 더 이상 없는 달만 0으로 맞춤, 끝나면 built 표시 문서(year=0, month=0) 저장
+    반환: 저장한 달 수 (충돌이 계속되면 None → 다음 조회 때 다시 시도)
+    """
+    for _ in range(retries):
+        revs = {(d["year"], d["month"]): d.get("rev") for d in db.letter_stats_monthly.find(
+            {"user_id": user_id, "year": {"$gt": 0}}, {"year": 1, "month": 1, "rev": 1}
+        )}
+        rows = _user_month_counts(user_id)
+        for key in revs:
+            rows.setdefault(key, {f: 0 for f in COUNT_FIELDS})
+        now = datetime.utcnow()
+        # rev 필터가 안 맞으면 upsert가 중복 키로 실패 → 충돌
+        ops = [_rebuild_op(user_id, key, key in revs, revs.get(key), counts, now)
+               for key, counts in rows.items()]
+        conflicts = 0
+        if ops:
+            try:
+                db.letter_stats_monthly.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != 11000 for err in errors):
+                    raise
+                conflicts = len(errors)
+        if not conflicts:
+            db.letter_stats_monthly.update_one(
+                _key(user_id, 0, 0), {"$set": {"built_at": now}}, upsert=True
+            )
+            return len(rows)
+    print(f"[report_store] 월별 추이 재계산 충돌 반복 ({user_id}), 다음 조회 때 다시 시도")
+    return None
+
+
+def rebuild_monthly_stats(user_id=None):
+    """
+    원본 letter/comment에서 letter_stats_monthly를 유저별로 다시 계산 (user_id 없으면 전체 유저)
+    반환: 저장한 (유저, 월) 문서 수
+    """
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = set(db.letter.distinct("from", {"from": {"$type": "objectId"}}))
+        user_ids.update(db.comment.distinct("from", {"from": {"$type": "objectId"}}))
+        user_ids.update(db.letter_stats_monthly.distinct("user_id"))
+    return sum(rebuild_user_monthly_stats(uid) or 0 for uid in user_ids)
+
+
+def get_monthly_stats(user_id):
+    """
+    유저의 월별 편지 수 (편지를 쓴 달만, 오래된 순)
+    built 표시 문서(year=0)가 없으면 훅 도입 전 데이터가 빠져 있을 수 있으므로 원본에서 한 번 계산
+    """
+    def read():
+        return list(db.letter_stats_monthly.find(
+            {"user_id": user_id}, {"_id": 0, "year": 1, "month": 1, "letters_count": 1}
+        ).sort([("year", 1), ("month", 1)]))
+
+    docs = read()
+    if not docs or docs[0]["year"] != 0:
+        rebuild_user_monthly_stats(user_id)
+        docs = read()
+    return [
+        {"_id": {"year": d["year"], "month": d["month"]}, "letters_count": d["letters_count"]}
+        for d in docs if d["year"] and d.get("letters_count", 0) > 0
+    ]
+
+
+def get_report(user_id, year, month):
+    """그 달 리포트 문서 (집계값 보장, 오래된 집계는 원본에서 다시 맞춤)"""
+    doc = db.report.find_one(_key(user_id, year, month)) or _key(user_id, year, month)
+    resync_before = datetime.utcnow() - timedelta(hours=REPORT_COUNTS_RESYNC_HOURS)
+    if not doc.get("counts_built") or (doc.get("counts_built_at") or datetime.min) < resync_before:
+        doc.update(rebuild_counts(user_id, year, month))
+    for f in COUNT_FIELDS:
+        doc.setdefault(f, 0)
+    doc.setdefault("selected_emotion_count", {})
+    return doc
+
+
+def month_letter_labels(user_id, year, month):
+    """그 달 편지의 저장된 감정/주제 라벨 (작성 순, 아직 분류되지 않은 편지는 제외)"""
+    start, end = month_range(year, month)
+    return list(db.letter.find(
+        {"from": user_id, "created_at": {"$gte": start, "$lt": end}, "labels_pending": False},
+        {"_id": 0, "topic": 1, "ai_emotions": 1}
+    ).sort("created_at", 1))
+
+
+def fingerprint(*parts):
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(repr(p).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def is_fresh(report_doc, name, fp):
+    saved = (report_doc.get("analysis") or {}).get(name)
+    return bool(saved) and saved.get("fingerprint") == fp
+
+
+def get_analysis(report_doc, name, fp, compute):
+    """
+    저장된 분석 결과의 fingerprint가 같으면 재사용, 아니면 compute() 후 저장
+    compute()가 None을 반환하면(실패) 저장하지 않음
+    """
+    if is_fresh(report_doc, name, fp):
+        return report_doc["analysis"][name].get("value")
+    value = compute()
+    if value is not None:
+        db.report.update_one(
+            _key(report_doc["user_id"], report_doc["year"], report_doc["month"]),
+            {"$set": {f"analysis.{name}": {
+                "value": value,
+                "fingerprint": fp,
+                "computed_at": datetime.utcnow(),
+            }}},
+            upsert=True
+        )
+    return value
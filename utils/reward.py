@@ -1,13 +1,38 @@
 # utils/reward.py
 
-import random
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 from utils.db import db
+from utils import item_catalog
 from utils.config import POINT_RULES
 
 LEVEL_UP_THRESHOLD = 100
 
+def level_up_pipeline(total_point):
+    """
+    point += total_point, LEVEL_UP_THRESHOLD 이상이면 level += 1, point = 0
+    (두 번째 스테이지의 "$point"는 첫 스테이지에서 적립된 값)
+    """
+    reached = {"$gte": ["$point", LEVEL_UP_THRESHOLD]}
+    return [
+        {"$set": {
+            "point": {"$add": [{"$ifNull": ["$point", 0]}, total_point]},
+            "level": {"$ifNull": ["$level", 1]},
+        }},
+        {"$set": {
+            "level": {"$cond": [reached, {"$add": ["$level", 1]}, "$level"]},
+            "point": {"$cond": [reached, 0, "$point"]},
+        }},
+    ]
+
+def is_level_up(point_after, total_point):
+    """
+    level_up_pipeline 적용 후 포인트로 레벨업 여부 판단
+    레벨업하면 포인트가 0으로 초기화되므로, 적립 후 포인트가 이번 적립분보다 작으면 레벨업한 것
+    """
+    return point_after < total_point
+
 def grant_point_by_action(user_id, action, extra_data=None):
     if action not in POINT_RULES:
         return False, f"올바르지 않은 액션입니다: {action}"
@@ -23,33 +48,31 @@ def grant_point_by_action(user_id, action, extra_data=None):
 
     total_point = base_point + bonus_point
 
-    user = db.user.find_one({"_id": user_id}, {"point": 1, "level": 1})
+    # 포인트 적립 + 레벨업을 한 번의 원자적 업데이트로 처리 (동시 적립 시 포인트 유실 방지)
+    user = db.user.find_one_and_update(
+        {"_id": user_id},
+        level_up_pipeline(total_point),
+        projection={"point": 1, "level": 1},
+        return_document=ReturnDocument.AFTER
+    )
     if not user:
         return False, "사용자를 찾을 수 없습니다."
 
-    current_point = user.get("point", 0)
-    current_level = user.get("level", 1)
-    new_point = current_point + total_point
-    leveled_up = False
+    leveled_up = is_level_up(user["point"], total_point)
     new_items = []
 
-    # 레벨업 조건 충족 시 처리
-    if new_point >= LEVEL_UP_THRESHOLD:
-        current_level += 1
-        new_point = 0
-        leveled_up = True
-
+    if leveled_up:
+        # 보유 목록은 유저별 인덱스 조회, 후보 선택은 메모리 카탈로그에서
         owned_items = db.user_item.distinct("item_type", {"user_id": user_id})
-        item_pool = list(db.item_catalog.find(
-            {"name": {"$nin": owned_items}},
-            {"_id": 0, "name": 1, "description": 1, "category": 1}
-        ))
+        reward_item = item_catalog.pick_unowned(owned_items)
 
-        if item_pool:
-            reward_item = random.choice(item_pool)
+        if reward_item:
             db.user_item.insert_one({
                 "user_id": user_id,
                 "item_type": reward_item["name"],
+                # 카탈로그 정보 스냅샷 (/item/my에서 조인 없이 조회)
+                "category": reward_item.get("category", ""),
+                "description": reward_item.get("description", ""),
                 "used": False,
                 "granted_at": datetime.utcnow()
             })
@@ -59,16 +82,11 @@ def grant_point_by_action(user_id, action, extra_data=None):
                 "category": reward_item.get("category", "")
             })
 
-    db.user.update_one(
-        {"_id": user_id},
-        {"$set": {"point": new_point, "level": current_level}}
-    )
-
     return True, {
         "point": total_point,
         "base_point": base_point,
         "bonus_point": bonus_point,
         "leveled_up": leveled_up,
-        "level": current_level,
+        "level": user["level"],
         "new_items": new_items
     }
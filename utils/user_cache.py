@@ -0,0 +1,188 @@
+# utils/user_cache.py
+# 유저 프로필 프로젝션 캐시 (ObjectId 키, LRU + TTL)
+#  - 기본: 프로세스 내 캐시
+#  - PROFILE_CACHE_REDIS_URL 설정 시: Redis 공유 캐시 (gunicorn 워커 간 무효화 일관성 보장)
+#    Redis 오류는 캐시 미스로 처리(DB 조회)하고 PROFILE_CACHE_REDIS_RETRY_SECONDS 동안 Redis를 건너뜀
+#  - 프로필 변경 지점(회원가입, 정보 수정, 비밀번호 변경)에서 invalidate() 호출 필수
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from bson import ObjectId
+from utils.db import db
+from utils import metrics
+from utils.config import (
+    PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_TTL_SECONDS, PROFILE_CACHE_REDIS_URL,
+    PROFILE_CACHE_REDIS_TIMEOUT_SECONDS, PROFILE_CACHE_REDIS_RETRY_SECONDS
+)
+
+# 캐시에 담는 필드 (비밀번호 해시·주소·전화번호는 제외)
+PROFILE_FIELDS = ("nickname", "limited_access", "email", "email_verified", "email_notify_enabled")
+_PROJECTION = {f: 1 for f in PROFILE_FIELDS}
+
+
+class _LocalStore:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for k in keys:
+                entry = self._data.get(k)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if expires_at < now:
+                    del self._data[k]
+                    continue
+                self._data.move_to_end(k)
+                found[k] = value
+        return found
+
+    def set_many(self, items):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for k, v in items.items():
+                self._data[k] = (expires_at, v)
+                self._data.move_to_end(k)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def size(self):
+        return len(self._data)
+
+
+class _RedisStore:
+    PREFIX = "profile:"
+
+    def __init__(self, url, ttl):
+        import redis  # 공유 모드에서만 필요한 선택 의존성
+        self._r = redis.Redis.from_url(
+            url,
+            socket_timeout=PROFILE_CACHE_REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=PROFILE_CACHE_REDIS_TIMEOUT_SECONDS,
+        )
+        self._errors = (redis.RedisError, OSError)
+        self._r.ping()  # from_url은 지연 연결이므로 여기서 실제로 연결 확인
+        self.ttl = ttl
+        self.evictions = 0
+        self.errors = 0
+        self._skip_until = 0.0
+
+    def _call(self, label, fn, default):
+        """Redis 호출. 오류면 default 반환 (장애 중에는 잠시 호출 자체를 건너뜀)"""
+        if time.monotonic() < self._skip_until:
+            return default
+        try:
+            return fn()
+        except self._errors as e:
+            self.errors += 1
+            self._skip_until = time.monotonic() + PROFILE_CACHE_REDIS_RETRY_SECONDS
+            print(f"[user_cache] Redis {label} 실패, {PROFILE_CACHE_REDIS_RETRY_SECONDS:g}초간 DB로 조회: {e}")
+            return default
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raw = self._call("get", lambda: self._r.mget([self.PREFIX + str(k) for k in keys]), None)
+        if raw is None:
+            return {}
+        return {k: json.loads(v) for k, v in zip(keys, raw) if v is not None}
+
+    def set_many(self, items):
+        def write():
+            pipe = self._r.pipeline()
+            for k, v in items.items():
+                pipe.setex(self.PREFIX + str(k), self.ttl, json.dumps(v, ensure_ascii=False, default=str))
+            pipe.execute()
+        self._call("set", write, None)
+
+    def delete(self, key):
+        # 실패하면 다른 워커에 이전 프로필이 TTL 동안 남을 수 있음 (로그로 확인)
+        self._call("delete", lambda: self._r.delete(self.PREFIX + str(key)), None)
+
+    def size(self):
+        return None
+
+
+def _make_store():
+    if PROFILE_CACHE_REDIS_URL:
+        try:
+            return _RedisStore(PROFILE_CACHE_REDIS_URL, PROFILE_CACHE_TTL_SECONDS)
+        except Exception as e:
+            print(f"[user_cache] Redis 연결 실패, 로컬 캐시로 대체: {e}")
+    return _LocalStore(PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_TTL_SECONDS)
+
+
+_store = _make_store()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key, n=1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def _oid(user_id):
+    return user_id if isinstance(user_id, ObjectId) else ObjectId(user_id)
+
+
+def get_profiles(user_ids):
+    """{ObjectId: 프로필 dict} 반환. 캐시 미스는 $in 한 번으로 채움. 없는 유저는 결과에서 빠짐."""
+    ids = list({_oid(u) for u in user_ids})
+    found = _store.get_many(ids)
+    missing = [u for u in ids if u not in found]
+    _count("hits", len(found))
+    _count("misses", len(missing))
+
+    if missing:
+        fetched = {}
+        for doc in db.user.find({"_id": {"$in": missing}}, _PROJECTION):
+            uid = doc.pop("_id")
+            fetched[uid] = doc
+        if fetched:
+            _store.set_many(fetched)
+        found.update(fetched)
+    return found
+
+
+def get_profile(user_id):
+    return get_profiles([user_id]).get(_oid(user_id))
+
+
+def invalidate(user_id):
+    """프로필이 바뀐 유저의 캐시 항목 제거 (다음 조회 시 DB에서 다시 채움)"""
+    _store.delete(_oid(user_id))
+    _count("invalidations")
+
+
+def stats():
+    with _stats_lock:
+        s = dict(_stats)
+    total = s["hits"] + s["misses"]
+    s["hit_rate"] = round(s["hits"] / total, 4) if total else None
+    s["evictions"] = _store.evictions
+    s["size"] = _store.size()
+    s["backend"] = "redis" if isinstance(_store, _RedisStore) else "local"
+    if isinstance(_store, _RedisStore):
+        s["redis_errors"] = _store.errors
+    s["max_entries"] = PROFILE_CACHE_MAX_ENTRIES
+    s["ttl_seconds"] = PROFILE_CACHE_TTL_SECONDS
+    return s
+
+
+metrics.register("profile_cache", stats)